@@ -1,7 +1,7 @@
 from fastapi import requests
 from xgboost import XGBClassifier
 from src.preprocessing.model_preprocessing import ModelPreprocesser
-from src.preprocessing.model_preprocessing import FeatureSelector
+from src.preprocessing.model_preprocessing import FeatureSelector, compile_pipeline
 from sklearn.pipeline import Pipeline
 from fastapi import FastAPI
 from http import HTTPStatus
@@ -33,7 +33,8 @@ def load_artifacts():
     logger.info("Loading model...")
     model = pickle.load(open(MODEL_PATH, 'rb'))
     logger.info("Loading preprocessing pipeline...")
-    pipeline = pickle.load(open(PIPELINE_PATH, 'rb'))
+    # Compiled to NumPy to avoid the pandas overhead on every request
+    pipeline = compile_pipeline(pickle.load(open(PIPELINE_PATH, 'rb')))
 
 def construct_response(f):
     """Construct a JSON response for an endpoint's results."""
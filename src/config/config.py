@@ -6,6 +6,7 @@ DATA_DIR = Path(BASE_DIR, 'data')
 FEATURES_DIR = Path(BASE_DIR, 'features')
 STORES_DIR = Path(BASE_DIR, 'stores')
 CODE_DIR = Path(BASE_DIR, 'src')
+RATINGS_PATH = Path(DATA_DIR, 'elo_ratings.pkl')
 
 # Final Features
 VARIABLES = [
@@ -20,6 +21,10 @@ VARIABLES = [
     'home_goals_conceded_t2', 'away_goals_conceded_t1', 
     'away_goals_conceded_t2', 'outcome']
 
+# Floating point type of the model features. 'float32' halves the memory of
+# the training data, the features are still computed in float64
+FEATURES_DTYPE = 'float64'
+
 DVC_FILES = [
     'prep_pipeline.pkl.dvc',
     'model.pkl.dvc',
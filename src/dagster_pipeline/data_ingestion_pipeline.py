@@ -1,7 +1,16 @@
 from typing import Dict
-from dagster import pipeline, solid, execute_pipeline
+from pathlib import Path
+from dagster import pipeline, solid, execute_pipeline, Field
 from src.scripts.data_ingestion.data_ingestion import retrieve_data, ingest_data
+from src.config.config import CODE_DIR, RATINGS_PATH
+from src.db import migrations
+from src.db.manager import get_config, get_engine
 from src.config.logger_config import logger
+from src.preprocessing.cleaning_preprocesses import RemoveWrongOutcome
+from src.preprocessing.config import RESULTS_COLS
+from src.preprocessing.ratings import EloRating
+
+import pandas as pd
 
 @solid
 def extract_data(context) -> dict:
@@ -9,16 +18,50 @@ def extract_data(context) -> dict:
 
     return data
 
-@solid
-def ingest_data_to_db(context, data : dict) -> None:
-    ingest_data(data)
+@solid(
+    config_schema={
+        # Whether to load the data with COPY, see DBManager.bulk_insert
+        'bulk_insert': Field(bool, is_required=False, default_value=False)
+    }
+)
+def ingest_data_to_db(context, data : dict) -> bool:
+    ingest_data(data, bulk=context.solid_config['bulk_insert'])
     context.log.info('Data inserted succesfully')
 
+    return True
+
+@solid
+def refresh_feature_view(context, inserted : bool) -> None:
+    # Only when the optional feature view was created by the migrations
+    engine = get_engine(get_config(Path(CODE_DIR, 'db/db_config.yml')))
+
+    if migrations.refresh_feature_view(engine):
+        context.log.info('Feature view refreshed')
+
+@solid
+def update_ratings(context, data : dict) -> None:
+    # Only the league matches after the last snapshot, and the last one
+    # when it got new results, are applied
+    if RATINGS_PATH.exists():
+        rating = EloRating.load(RATINGS_PATH)
+    else:
+        rating = EloRating()
+
+    # The first league match of each season is rated too, only the matches
+    # without a valid outcome, e.g. not played yet, are left for later
+    results = pd.DataFrame(data['results'], columns=RESULTS_COLS)
+    results = RemoveWrongOutcome()(results)
+    rating.update(results).save(RATINGS_PATH)
+    context.log.info(f'Ratings updated up to {rating.watermark}')
+
 @pipeline
 def data_ingestion_pipeline():
-    ingest_data_to_db(extract_data())
+    data = extract_data()
+    inserted = ingest_data_to_db(data)
+    refresh_feature_view(inserted)
+    update_ratings(data)
 
 if __name__ == '__main__':
     logger.info('DAGSTER: Data Ingestion Pipeline started')
     execute_pipeline(data_ingestion_pipeline)
-    logger.info('DAGSTER: Data Ingestion Pipeline finished')
\ No newline at end of file
+    logger.info('DAGSTER: Data Ingestion Pipeline finished')
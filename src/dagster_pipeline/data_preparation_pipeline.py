@@ -1,44 +1,208 @@
 import pickle
 
+from functools import partial
 from pathlib import Path
 
-from src.config.config import CODE_DIR, DATA_DIR
+from src.config.config import CODE_DIR, DATA_DIR, VARIABLES
 from src.config.logger_config import logger
-from src.preprocessing.cleaning_preprocesses import cleaning_pipeline
+from src.preprocessing.cleaning_preprocesses import (
+    cleaning_pipeline,
+    ValidateRankingCoverage
+)
+from src.preprocessing.config import RESULTS_COLS
 from src.preprocessing.data_retriever import DataRetriever
+from src.preprocessing.dependencies import (
+    get_required_columns,
+    get_required_ranking_features
+)
 from src.preprocessing.model_preprocessing import feature_eng_pipeline, fit_and_process_data
-from src.preprocessing.utils import get_training_test_sets
-from src.preprocessing.features_preprocesses import get_feature_pipeline
-from dagster import solid, Output, OutputDefinition, execute_pipeline, pipeline
+from src.preprocessing.utils import get_training_test_sets, SeasonParallelPipeline
+from src.preprocessing.features_preprocesses import (
+    get_feature_pipeline,
+    ComputeEloRating
+)
+from src.preprocessing.materialization import FeatureTable
+from src.preprocessing.ratings import get_required_rating
+from dagster import (
+    solid,
+    Field,
+    Noneable,
+    Output,
+    OutputDefinition,
+    execute_pipeline,
+    pipeline
+)
+
+FEATURES_PATH = Path(DATA_DIR, 'features_data.parquet')
 
 @solid(
+    config_schema={
+        # 'orm', 'sql' or 'copy', see DataRetriever.get_historical_data
+        'method': Field(str, is_required=False, default_value='sql'),
+        # Whether to read the four tables at the same time
+        'concurrent': Field(bool, is_required=False, default_value=True),
+        # Whether to only read the data after the feature table watermark
+        'incremental': Field(bool, is_required=False, default_value=False)
+    },
     output_defs=[
         OutputDefinition(name='results', is_required=True),
         OutputDefinition(name='general', is_required=True),
         OutputDefinition(name='home', is_required=True),
-        OutputDefinition(name='away', is_required=True)
+        OutputDefinition(name='away', is_required=True),
+        OutputDefinition(name='incremental', is_required=True)
     ]
 )
 def get_raw_data(context):
     logger.info('Data Preparation Pipeline: Getting the Raw Data')
     db_config = Path(CODE_DIR, 'db/db_config.yml')
     retriever = DataRetriever(db_config)
+    # Only the columns needed to compute the final variables are retrieved
+    columns = get_required_columns(VARIABLES)
+    method = context.solid_config['method']
+
+    feature_table = FeatureTable(FEATURES_PATH)
+    watermark = feature_table.get_watermark()
+    incremental = context.solid_config['incremental'] and watermark is not None
 
-    results, general, home, away = retriever.get_historical_data()
+    if incremental:
+        # Only the results after the last persisted league match, and the
+        # rankings needed to compute their features. The teams of the
+        # persisted features keep the categories of the feature table.
+        logger.info(f'Getting the data since {watermark}')
+        results, general, home, away = retriever.get_data_since(
+                                            *watermark, columns,
+                                            method='sql' if method == 'orm'
+                                                    else method,
+                                            teams=feature_table.get_teams())
+    else:
+        results, general, home, away = retriever.get_historical_data(
+                                        columns, method=method,
+                                        concurrent=context.solid_config['concurrent'])
 
     yield Output(results, 'results')
     yield Output(general, 'general')
     yield Output(home, 'home')
     yield Output(away, 'away')
+    yield Output(incremental, 'incremental')
 
-@solid
-def basic_preprocessing(context, results, general, home, away):
+@solid(
+    config_schema={
+        # Processes used to compute the features on full rebuilds. All the
+        # CPUs are used by default
+        'n_workers': Field(Noneable(int), is_required=False, default_value=None),
+        # Whether to drop the results without rankings instead of failing
+        'drop_missing_rankings': Field(bool, is_required=False,
+                                        default_value=False)
+    }
+)
+def basic_preprocessing(context, results, general, home, away, incremental):
     logger.info('Data Preparation Pipeline: Basic Preprocessing')
     clean_pipeline = cleaning_pipeline()
     results = clean_pipeline(results)
 
-    feature_pipeline = get_feature_pipeline(general, home, away)
-    data = feature_pipeline(results)
+    # Checks all the rankings are available before computing the features
+    validate_rankings = ValidateRankingCoverage(
+                            general, home, away,
+                            drop=context.solid_config['drop_missing_rankings'])
+    results = validate_rankings(results)
+
+    feature_table = FeatureTable(FEATURES_PATH)
+    # Features which are not used by the models are not computed
+    features = get_required_ranking_features(VARIABLES)
+    rating = get_required_rating(VARIABLES)
+
+    # Only computes the features of the league matches played after the
+    # last persisted one
+    if incremental:
+        results = feature_table.get_new_results(results)
+        logger.info(f'Computing features for {len(results)} new results')
+        feature_pipeline = get_feature_pipeline(general, home, away,
+                                                features=features,
+                                                rating=rating)
+        data = feature_table.append(feature_pipeline(results))
+    else:
+        parallel_pipeline = SeasonParallelPipeline(
+                                partial(get_feature_pipeline,
+                                        features=features, rating=rating),
+                                [general, home, away],
+                                n_workers=context.solid_config['n_workers'])
+        data = parallel_pipeline(results)
+        feature_table.save(data)
+
+    return data
+
+@solid(
+    config_schema={
+        # Rows fetched from the database at once
+        'chunk_size': Field(int, is_required=False, default_value=10000),
+        # Whether to drop the results without rankings instead of failing
+        'drop_missing_rankings': Field(bool, is_required=False,
+                                        default_value=False)
+    }
+)
+def stream_features(context):
+    logger.info('Data Preparation Pipeline: Streaming Features')
+    db_config = Path(CODE_DIR, 'db/db_config.yml')
+    retriever = DataRetriever(db_config)
+    clean_pipeline = cleaning_pipeline()
+    features = get_required_ranking_features(VARIABLES)
+    rating = get_required_rating(VARIABLES)
+
+    # The data is retrieved, processed and written season by season, so
+    # the memory does not grow with the history
+    def compute_features():
+        seasons = retriever.stream_historical_data(
+                        get_required_columns(VARIABLES),
+                        chunk_size=context.solid_config['chunk_size'])
+
+        for results, general, home, away in seasons:
+            results = clean_pipeline(results)
+            validate_rankings = ValidateRankingCoverage(
+                            general, home, away,
+                            drop=context.solid_config['drop_missing_rankings'])
+            results = validate_rankings(results)
+
+            feature_pipeline = get_feature_pipeline(general, home, away,
+                                                    features=features,
+                                                    rating=rating)
+
+            yield feature_pipeline(results)
+
+    feature_table = FeatureTable(FEATURES_PATH)
+    feature_table.save_chunks(compute_features())
+
+    # The path instead of the table, so the features are not held in memory
+    # after streaming them
+    return str(FEATURES_PATH)
+
+@solid(
+    config_schema={
+        # 'sql' or 'copy', see DataRetriever.get_feature_view
+        'method': Field(str, is_required=False, default_value='sql')
+    }
+)
+def get_view_features(context):
+    logger.info('Data Preparation Pipeline: Getting the Feature View')
+    db_config = Path(CODE_DIR, 'db/db_config.yml')
+    retriever = DataRetriever(db_config)
+
+    # The ranking features are joined in the database, only the required
+    # ones are transferred
+    columns = RESULTS_COLS + [f'{feature}_{team}' for _, _, feature
+                                in get_required_ranking_features(VARIABLES)
+                                for team in ('t1', 't2')]
+    data = retriever.get_feature_view(columns,
+                                    method=context.solid_config['method'])
+
+    # The view already leaves out the results without rankings
+    data = cleaning_pipeline()(data).reset_index(drop=True)
+
+    # The Elo ratings are not computed in the database
+    rating = get_required_rating(VARIABLES)
+
+    if rating is not None:
+        data = ComputeEloRating(rating)(data)
+    FeatureTable(FEATURES_PATH).save(data)
 
     return data
 
@@ -53,6 +217,11 @@ def basic_preprocessing(context, results, general, home, away):
 def data_split(context, data):
     logger.info('Data Preparation Pipeline: Data Split')
 
+    # The streaming pipeline gives the feature table path, it is read here
+    # because the split needs the whole table
+    if isinstance(data, str):
+        data = FeatureTable(data).load()
+
     X_train, X_test, y_train, y_test = get_training_test_sets(data)
     
     yield Output(X_train, 'X_train')
@@ -83,9 +252,27 @@ def model_preprocessing(context, X_train, X_test, y_train, y_test):
 @pipeline
 def data_preparation_pipeline():
     # Load data from the database
-    results, general, home, away = get_raw_data()
+    results, general, home, away, incremental = get_raw_data()
     # Join the data to create an unique dataset
-    data = basic_preprocessing(results, general, home, away)
+    data = basic_preprocessing(results, general, home, away, incremental)
+    # Split the data intro training and test sets
+    X_train, X_test, y_train, y_test = data_split(data)
+    # Preprocess the data to be ready to train the models
+    model_preprocessing(X_train, X_test, y_train, y_test)
+
+@pipeline
+def streaming_data_preparation_pipeline():
+    # Compute the features streaming the data from the database
+    features_path = stream_features()
+    # Split the data intro training and test sets
+    X_train, X_test, y_train, y_test = data_split(features_path)
+    # Preprocess the data to be ready to train the models
+    model_preprocessing(X_train, X_test, y_train, y_test)
+
+@pipeline
+def view_data_preparation_pipeline():
+    # Read the features computed by the materialized view of the database
+    data = get_view_features()
     # Split the data intro training and test sets
     X_train, X_test, y_train, y_test = data_split(data)
     # Preprocess the data to be ready to train the models
@@ -1,4 +1,11 @@
-from dagster import solid, Output, OutputDefinition, pipeline, execute_pipeline
+from dagster import (
+    solid,
+    Field,
+    Output,
+    OutputDefinition,
+    pipeline,
+    execute_pipeline
+)
 from src.inference.utils import (
     get_last_data,
     preprocess_for_inference,
@@ -7,6 +14,11 @@ from src.inference.utils import (
 )
 
 @solid(
+    config_schema={
+        # Whether to read the rankings before the round from the database
+        # instead of scraping them
+        'rankings_from_db': Field(bool, is_required=False, default_value=True)
+    },
     output_defs=[
         OutputDefinition(name='results', is_required=True),
         OutputDefinition(name='general', is_required=True),
@@ -15,7 +27,8 @@ from src.inference.utils import (
     ]
 )
 def load_data(context):
-    results, general, home, away = get_last_data()
+    results, general, home, away = get_last_data(
+                                context.solid_config['rankings_from_db'])
 
     yield Output(results, 'results')
     yield Output(general, 'general')
@@ -1,19 +1,95 @@
+import csv
+import io
+import threading
 import yaml
 import os
 
-from typing import Union, List, Optional
-from src.db.data import Base
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+
+from typing import Dict, Iterator, Union, List, Optional, Tuple
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import select
+from sqlalchemy import MetaData, Table, and_, select, tuple_, union
+from sqlalchemy.sql import sqltypes
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Engines shared by all the managers of the process, by database URL
+_ENGINES: Dict[str, Engine] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+def get_config(config_file : str) -> dict:
+    with open(config_file) as file:
+        data = yaml.full_load(file)
+
+    return data
+
+def get_url(config : dict) -> str:
+    # SQLite databases, e.g. in the tests, are a file
+    if config['db_engine'].startswith('sqlite'):
+        return f'{config["db_engine"]}:///{config["db_name"]}'
+
+    return f'{config["db_engine"]}://{os.getenv("DB_USER")}:'\
+            f'{os.getenv("DB_PASSWORD")}@{os.getenv("DB_HOST")}:'\
+            f'{config["port"]}/{config["db_name"]}'
+
+def get_engine(config : dict) -> Engine:
+    """
+    Gets the engine of the configured database, it is created once per
+    process with the pool settings of the configuration
+
+    Parameters
+    ----------
+    config : dict
+        Database configuration
+
+    Returns
+    -------
+    Engine
+        SQLAlchemy engine
+    """
+    url = get_url(config)
+
+    with _REGISTRY_LOCK:
+        if url not in _ENGINES:
+            pool_options = {
+                'pool_recycle': config.get('pool_recycle', -1),
+                'pool_pre_ping': config.get('pool_pre_ping', False)
+            }
+
+            # SQLite does not always use a sized pool
+            if not url.startswith('sqlite'):
+                pool_options.update(pool_size=config.get('pool_size', 5),
+                                    max_overflow=config.get('max_overflow', 10))
+
+            _ENGINES[url] = create_engine(url, **pool_options)
+
+    return _ENGINES[url]
+
+def dispose_engines() -> None:
+    """
+    Closes the pooled connections of all the engines, the managers must be
+    closed before
+    """
+    with _REGISTRY_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+
+        _ENGINES.clear()
+
 class DBManager():
     """
-    This class defines a manager to handle SQLAlchemy ORM
+    This class defines a manager to handle SQLAlchemy ORM. The managers of
+    the same database share the engine, so creating one does not open new
+    connections, but each one has its own sessions, so closing a manager
+    does not close the sessions of the others. The schema is created by
+    src.db.migrations.
 
     Parameters
     ----------
@@ -26,36 +102,88 @@ class DBManager():
         Dictionary containing the configuration data
     _engine : object
         SQLAlchemy ORM engine
-    _session : sessionmaker.Session
-        SQLAlchemy session
+    _sessions : scoped_session
+        Registry of the SQLAlchemy session of each thread of this manager
     """
     def __init__(self, config_file : str) -> None:
-        self._config = self._get_config(config_file)
-        self._engine = self._get_engine()
-        self._session = sessionmaker(bind=self._engine)()
-
-        Base.metadata.create_all(self._engine)
-
-    def _get_config(self, config_file : str) -> dict:
-        with open(config_file) as file:
-            data = yaml.full_load(file)
-
-        return data
-
-    def _get_engine(self) -> None:
-        data = f'{self._config["db_engine"]}://{os.getenv("DB_USER")}:'\
-                f'{os.getenv("DB_PASSWORD")}@{os.getenv("DB_HOST")}:'\
-                f'{self._config["port"]}/{self._config["db_name"]}'
-        
-        engine = create_engine(data)
+        self._config = get_config(config_file)
+        self._engine = get_engine(self._config)
+        self._sessions = scoped_session(sessionmaker(bind=self._engine))
 
-        return engine
+    @property
+    def _session(self):
+        # Session of the current thread
+        return self._sessions()
 
     def insert(self, data, classtype) -> None:
         statement = insert(classtype).values(data).on_conflict_do_nothing()
         self._session.execute(statement)
         self._session.commit()
 
+    def bulk_insert(self, data: List[tuple], table: object,
+                    batch_size: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Inserts the rows which are not in the table yet. Each batch is
+        copied into a temporary staging table with COPY ... FROM STDIN and
+        merged with INSERT ... SELECT ... ON CONFLICT DO NOTHING, so there is
+        not a statement parameter per value.
+
+        Parameters
+        ----------
+        data : List[tuple]
+            Rows with the values of all the table columns, in order
+        table : object
+            Table mapping
+        batch_size : int, optional
+            Rows per batch, by default the 'batch_size' of the configuration
+
+        Returns
+        -------
+        Tuple[int, int]
+            Number of rows inserted and skipped because they already existed
+        """
+        if batch_size is None:
+            batch_size = self._config.get('batch_size', 10000)
+
+        table_name = table.__tablename__
+        staging_name = f'{table_name}_staging'
+        columns = ', '.join(column.name for column in table.__table__.columns)
+
+        inserted = 0
+        connection = self._engine.raw_connection()
+
+        try:
+            with connection.cursor() as cursor:
+                # The rows are removed when each batch is committed. It may
+                # exist if a previous load failed on the same connection.
+                cursor.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS '
+                                f'{staging_name} (LIKE {table_name}) '
+                                f'ON COMMIT DELETE ROWS')
+                connection.commit()
+
+                for start in range(0, len(data), batch_size):
+                    batch = to_csv_buffer(data[start:start + batch_size])
+                    cursor.copy_expert(f"COPY {staging_name} ({columns}) "
+                                        f"FROM STDIN WITH CSV NULL '\\N'",
+                                        batch)
+                    cursor.execute(f'INSERT INTO {table_name} ({columns}) '
+                                    f'SELECT {columns} FROM {staging_name} '
+                                    f'ON CONFLICT DO NOTHING')
+                    inserted += cursor.rowcount
+                    connection.commit()
+
+                cursor.execute(f'DROP TABLE {staging_name}')
+                connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        skipped = len(data) - inserted
+
+        return inserted, skipped
+
     def select(self, table: object, limit : Optional[int] = None):
         if limit is None:
             statement = select([table]).\
@@ -71,27 +199,318 @@ class DBManager():
         # the desired Table mapping and all() to get all mappings as a list
         return result.scalars().all()
 
+    def select_columns(self, table: object, columns: List[str]) -> List[tuple]:
+        """
+        Selects only the given columns of a table
+
+        Parameters
+        ----------
+        table : object
+            Table mapping
+        columns : List[str]
+            Columns' names
+
+        Returns
+        -------
+        List[tuple]
+            Rows ordered by season and league match
+        """
+        statement = select(*[getattr(table, column) for column in columns]).\
+                    order_by(table.season, table.league_match)
+
+        # A connection of the pool instead of the session, so it can be
+        # called from several threads
+        with self._engine.connect() as connection:
+            return connection.execute(statement).all()
+
+    def select_distinct(self, columns: List) -> List:
+        """
+        Selects the distinct values of several columns
+
+        Parameters
+        ----------
+        columns : List
+            Mapped columns, e.g. the team columns of every table
+
+        Returns
+        -------
+        List
+            Sorted distinct values
+        """
+        statement = union(*[select(column.label('value')) for column in columns])
+
+        with self._engine.connect() as connection:
+            return sorted(connection.execute(statement).scalars().all())
+
+    def read_dataframe(self, table: object, columns: Optional[List[str]] = None,
+                        method: str = 'sql') -> pd.DataFrame:
+        """
+        Reads a table into a dataframe without creating the ORM objects
+
+        Parameters
+        ----------
+        table : object
+            Table mapping
+        columns : List[str], optional
+            Columns' names. All the table columns by default.
+        method : str
+            'sql' reads the rows of a Core select with pandas, 'copy' streams
+            the select as CSV with COPY ... TO STDOUT and parses it with Arrow
+
+        Returns
+        -------
+        pd.DataFrame
+            Rows ordered by season and league match
+        """
+        if columns is None:
+            columns = [column.name for column in table.__table__.columns]
+
+        statement = select(*[getattr(table, column) for column in columns]).\
+                    order_by(table.season, table.league_match)
+
+        return self._read_statement(statement, method)
+
+    def get_data_since(self, table: object, season: int, league_match: int,
+                        columns: Optional[List[str]] = None,
+                        inclusive: bool = False,
+                        method: str = 'sql') -> pd.DataFrame:
+        """
+        Reads the rows after a (season, league_match) watermark
+
+        Parameters
+        ----------
+        table : object
+            Table mapping
+        season : int
+            Season of the watermark
+        league_match : int
+            League match of the watermark
+        columns : List[str], optional
+            Columns' names. All the table columns by default.
+        inclusive : bool
+            Whether to include the rows of the watermark league match
+        method : str
+            'sql' or 'copy', see read_dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            Rows ordered by season and league match
+        """
+        if columns is None:
+            columns = [column.name for column in table.__table__.columns]
+
+        # Range over the leading primary key columns
+        key = tuple_(table.season, table.league_match)
+        watermark = tuple_(int(season), int(league_match))
+        condition = key >= watermark if inclusive else key > watermark
+
+        statement = select(*[getattr(table, column) for column in columns]).\
+                    where(condition).\
+                    order_by(table.season, table.league_match)
+
+        return self._read_statement(statement, method)
+
+    def read_view(self, name: str, columns: List[str],
+                    method: str = 'sql') -> pd.DataFrame:
+        """
+        Reads a view without ORM mapping into a dataframe
+
+        Parameters
+        ----------
+        name : str
+            View name
+        columns : List[str]
+            Columns' names, including season and league_match
+        method : str
+            'sql' or 'copy', see read_dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            Rows ordered by season and league match
+        """
+        # Reflected, so the columns have their types
+        view = Table(name, MetaData(), autoload_with=self._engine)
+        statement = select(*[view.c[column] for column in columns]).\
+                    order_by(view.c.season, view.c.league_match)
+
+        return self._read_statement(statement, method)
+
+    def _read_statement(self, statement, method: str) -> pd.DataFrame:
+        if method == 'sql':
+            with self._engine.connect() as connection:
+                return pd.read_sql(statement, connection)
+
+        if method == 'copy':
+            return self._copy_to_dataframe(statement)
+
+        raise ValueError(f"Unknown read method '{method}', "
+                        f"expected 'sql' or 'copy'")
+
+    def stream_dataframes(self, table: object, columns: Optional[List[str]] = None,
+                        chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        Reads a table in chunks through a server-side cursor, so only one
+        chunk is held in memory at a time
+
+        Parameters
+        ----------
+        table : object
+            Table mapping
+        columns : List[str], optional
+            Columns' names. All the table columns by default.
+        chunk_size : int
+            Rows per chunk
+
+        Yields
+        ------
+        pd.DataFrame
+            Chunks of rows ordered by season and league match
+        """
+        if columns is None:
+            columns = [column.name for column in table.__table__.columns]
+
+        statement = select(*[getattr(table, column) for column in columns]).\
+                    order_by(table.season, table.league_match)
+
+        with self._engine.connect() as connection:
+            result = connection.execution_options(stream_results=True,
+                                                yield_per=chunk_size).\
+                                execute(statement)
+
+            for rows in result.partitions():
+                yield pd.DataFrame(rows, columns=columns)
+
+    def _copy_to_dataframe(self, statement) -> pd.DataFrame:
+        query = statement.compile(dialect=postgresql.dialect(),
+                                compile_kwargs={'literal_binds': True})
+        buffer = io.BytesIO()
+        connection = self._engine.raw_connection()
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH CSV HEADER',
+                                    buffer)
+        finally:
+            connection.close()
+
+        buffer.seek(0)
+
+        # The types of the selected columns instead of the inferred ones.
+        # COPY writes NULL unquoted and empty strings quoted, so only the
+        # unquoted empty values are null and 'NA' is a string.
+        options = pyarrow.csv.ConvertOptions(
+                    column_types=get_arrow_types(statement.selected_columns),
+                    null_values=[''], strings_can_be_null=True,
+                    quoted_strings_can_be_null=False)
+
+        return pyarrow.csv.read_csv(buffer, convert_options=options).to_pandas()
+
     def select_ranking(self, table, team, season, league_match):
-        statement = select(table).where((table.team == team) and
-                                    (table.season == season) and 
-                                    (table.league_match == league_match))
+        statement = select(table).where(and_(table.team == team,
+                                            table.season == season,
+                                            table.league_match == league_match))
 
         result = self._session.execute(statement)
 
         return result.scalars().all()
 
     def select_result(self, table, team_1, team_2, season, league_match):
-        statement = select(table).where((table.team_1 == team_1) and
-                                    (table.team_2 == team_2) and
-                                    (table.season == season) and 
-                                    (table.league_match == league_match))
+        statement = select(table).where(and_(table.team_1 == team_1,
+                                            table.team_2 == team_2,
+                                            table.season == season,
+                                            table.league_match == league_match))
+
+        result = self._session.execute(statement)
+
+        return result.scalars().all()
+
+    def select_rankings(self, table, keys: List[Tuple[int, int, str]]):
+        """
+        Selects the rankings of many teams in a single query
+
+        Parameters
+        ----------
+        table : object
+            Ranking table mapping
+        keys : List[Tuple[int, int, str]]
+            (season, league_match, team) keys
+
+        Returns
+        -------
+        List[object]
+            Rankings found, ordered by season and league match
+        """
+        return self._select_keys(table, (table.season, table.league_match,
+                                        table.team), keys)
+
+    def select_results(self, table, keys: List[Tuple[int, int, str, str]]):
+        """
+        Selects many results in a single query
+
+        Parameters
+        ----------
+        table : object
+            Results table mapping
+        keys : List[Tuple[int, int, str, str]]
+            (season, league_match, team_1, team_2) keys
+
+        Returns
+        -------
+        List[object]
+            Results found, ordered by season and league match
+        """
+        return self._select_keys(table, (table.season, table.league_match,
+                                        table.team_1, table.team_2), keys)
+
+    def _select_keys(self, table, columns: Tuple, keys: List[Tuple]):
+        if not keys:
+            return []
+
+        # The keys are the primary key columns in order, so the tuple IN is
+        # resolved with the primary key index
+        statement = select(table).\
+                    where(tuple_(*columns).in_(list(dict.fromkeys(keys)))).\
+                    order_by(table.season, table.league_match)
 
         result = self._session.execute(statement)
 
         return result.scalars().all()
 
     def close(self) -> None:
-        self._session.close()
+        self._sessions.remove()
 
     def open(self) -> None:
-        self._session = sessionmaker(bind=self._engine)()
\ No newline at end of file
+        # A new session is created on demand for the current thread
+        self._sessions.remove()
+
+def get_arrow_types(columns) -> Dict[str, pa.DataType]:
+    """
+    Gets the Arrow types of the selected columns, the ones pandas.read_sql
+    gives for their SQL types: int64 for integers, float64 for floats and
+    strings. The columns of other types are inferred.
+    """
+    types = {}
+
+    for column in columns:
+        if isinstance(column.type, sqltypes.Integer):
+            types[column.name] = pa.int64()
+        elif isinstance(column.type, sqltypes.Float):
+            types[column.name] = pa.float64()
+        elif isinstance(column.type, sqltypes.String):
+            types[column.name] = pa.string()
+
+    return types
+
+def to_csv_buffer(rows: List[tuple]) -> io.StringIO:
+    """
+    Writes the rows as CSV for COPY, with None written as \\N
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(tuple('\\N' if value is None else value for value in row)
+                    for row in rows)
+    buffer.seek(0)
+
+    return buffer
@@ -0,0 +1,325 @@
+import argparse
+import os
+
+from src.config.config import CODE_DIR
+from src.config.logger_config import logger
+from typing import List, Tuple
+from sqlalchemy import case, inspect, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from src.db.data import Base, Results, GeneralRanking, HomeRanking, AwayRanking
+from src.db.manager import get_config, get_engine
+from src.preprocessing.config import RANKING_FEATURES, RESULTS_COLS
+
+# Materialized view with the results joined to the rankings of both teams
+# before each match
+FEATURE_VIEW = 'features_view'
+FEATURE_VIEW_COLUMNS = RESULTS_COLS + [f'{feature}_{team}'
+                                        for _, _, feature in RANKING_FEATURES
+                                        for team in ('t1', 't2')]
+RANKING_TABLES = {'general': GeneralRanking, 'home': HomeRanking,
+                'away': AwayRanking}
+
+# The (season, league_match, team) and (season, league_match, team_1, team_2)
+# lookups are resolved with the composite primary keys. These indexes of a
+# team's history were created by earlier migrations, but no query uses them.
+UNUSED_INDEXES = [f'ix_{table.__tablename__}_team_season_league_match'
+                    for table in RANKING_TABLES.values()] + \
+                [f'ix_results_{team}_season_league_match'
+                    for team in ('team_1', 'team_2')]
+
+def create_schema(config_file : str) -> None:
+    """
+    Creates the tables which do not exist yet. It is run once when the
+    database is set up or the models change, not every time a DBManager is
+    created.
+
+    Parameters
+    ----------
+    config_file : str
+        Database configuration file path
+    """
+    engine = get_engine(get_config(config_file))
+
+    Base.metadata.create_all(engine)
+    drop_unused_indexes(engine)
+    logger.info('Migrations: schema created')
+
+def drop_unused_indexes(engine : Engine) -> None:
+    """
+    Drops the indexes created by earlier migrations which no query uses,
+    they only slow down the inserts
+    """
+    with engine.begin() as connection:
+        for index in UNUSED_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {index}'))
+
+def get_partition_ranges(first_season : int, last_season : int,
+                        size : int) -> List[Tuple[int, int]]:
+    """
+    Splits the seasons into ranges of the given size, the end is exclusive
+    """
+    return [(start, min(start + size, last_season + 1))
+            for start in range(first_season, last_season + 1, size)]
+
+def get_partitioned_table_sql(table, first_season : int, last_season : int,
+                                size : int) -> List[str]:
+    """
+    Builds the statements which create a table partitioned by season range,
+    with the same columns and primary key as the model, its partitions and
+    a default partition for the seasons out of the ranges
+
+    Parameters
+    ----------
+    table : object
+        Table mapping
+    first_season : int
+        First season of the partitions
+    last_season : int
+        Last season of the partitions
+    size : int
+        Seasons per partition
+
+    Returns
+    -------
+    List[str]
+        DDL statements
+    """
+    name = table.__tablename__
+    create = str(CreateTable(table.__table__).compile(
+                                dialect=postgresql.dialect())).strip()
+    statements = [f'{create} PARTITION BY RANGE (season)']
+
+    for start, end in get_partition_ranges(first_season, last_season, size):
+        statements.append(f'CREATE TABLE {name}_{start}_{end - 1} PARTITION OF '
+                            f'{name} FOR VALUES FROM ({start}) TO ({end})')
+
+    statements.append(f'CREATE TABLE {name}_default PARTITION OF {name} DEFAULT')
+
+    return statements
+
+def partition_by_season(engine : Engine, first_season : int,
+                        last_season : int, size : int = 5) -> None:
+    """
+    Partitions the results and ranking tables by season range. The primary
+    keys of the partitioned tables are created on every partition, and the
+    ORM models and DBManager work unchanged. The rows of the existing tables
+    are moved to the new ones.
+
+    Declarative partitioning with primary keys, indexes on the partitioned
+    table, default partitions and INSERT ... ON CONFLICT requires
+    PostgreSQL 11 or newer.
+
+    Parameters
+    ----------
+    engine : Engine
+        Database engine
+    first_season : int
+        First season of the partitions
+    last_season : int
+        Last season of the partitions
+    size : int
+        Seasons per partition
+
+    Raises
+    ------
+    RuntimeError
+        If the server is older than PostgreSQL 11
+    """
+    with engine.begin() as connection:
+        version = int(connection.execute(text('SHOW server_version_num')).scalar())
+
+        if version < 110000:
+            raise RuntimeError(f'Partitioning by season requires PostgreSQL 11 '
+                                f'or newer, the server version is {version}')
+
+        partitioned = {row[0] for row in connection.execute(text(
+                        'SELECT c.relname FROM pg_partitioned_table p '
+                        'JOIN pg_class c ON c.oid = p.partrelid'))}
+        existing = set(inspect(connection).get_table_names())
+
+        # The view depends on the tables, it is created again afterwards
+        view = connection.execute(text('SELECT 1 FROM pg_matviews '
+                                        'WHERE matviewname = :name'),
+                                    {'name': FEATURE_VIEW}).first()
+        connection.execute(text(f'DROP MATERIALIZED VIEW IF EXISTS {FEATURE_VIEW}'))
+
+        for table in (Results, GeneralRanking, HomeRanking, AwayRanking):
+            name = table.__tablename__
+
+            if name in partitioned:
+                logger.info(f'Migrations: {name} is already partitioned')
+                continue
+
+            if name in existing:
+                connection.execute(text(f'ALTER TABLE {name} '
+                                        f'RENAME TO {name}_unpartitioned'))
+                # The primary key index keeps its name after the rename
+                connection.execute(text(f'ALTER INDEX IF EXISTS {name}_pkey '
+                                        f'RENAME TO {name}_unpartitioned_pkey'))
+
+            for statement in get_partitioned_table_sql(table, first_season,
+                                                        last_season, size):
+                connection.execute(text(statement))
+
+            if name in existing:
+                # The columns are listed, the old table may have them in
+                # another order
+                columns = ', '.join(column.name for column in table.__table__.columns)
+                connection.execute(text(f'INSERT INTO {name} ({columns}) '
+                                        f'SELECT {columns} FROM {name}_unpartitioned'))
+                connection.execute(text(f'DROP TABLE {name}_unpartitioned'))
+
+            logger.info(f'Migrations: {name} partitioned by season')
+
+    if view is not None:
+        create_feature_view(engine)
+
+def fix_results_orientation(engine : Engine) -> int:
+    """
+    Fixes the results scraped when the second round was parsed as played at
+    team_2's home, with the outcome swapped. team_1 is always the home team,
+    so the home column is set back to team_1 and the outcome is swapped
+    back. The fixed rows are not matched again.
+
+    Returns
+    -------
+    int
+        Number of fixed results
+    """
+    outcome = case((Results.outcome == 'team_1', 'team_2'),
+                    (Results.outcome == 'team_2', 'team_1'),
+                    else_=Results.outcome)
+    statement = update(Results).where(Results.home == 'team_2')\
+                    .values(home='team_1', outcome=outcome)
+
+    with engine.begin() as connection:
+        fixed = connection.execute(statement).rowcount
+
+    logger.info(f'Migrations: {fixed} results fixed')
+
+    return fixed
+
+def get_feature_view_sql(features: List[Tuple[str, str, str]] = RANKING_FEATURES
+                        ) -> str:
+    """
+    Builds the query of the feature view, equivalent to the feature
+    pipeline: every result is joined with the rankings of both teams after
+    the previous league match, one join per ranking table and team
+
+    Parameters
+    ----------
+    features : List[Tuple[str, str, str]]
+        Features as (ranking table, ranking column, feature)
+
+    Returns
+    -------
+    str
+        SELECT statement
+    """
+    columns = [f'r.{column}' for column in RESULTS_COLS]
+    joins = []
+
+    for name, table in RANKING_TABLES.items():
+        for team in ('t1', 't2'):
+            alias = f'{name}_{team}'
+            team_column = 'team_1' if team == 't1' else 'team_2'
+            joins.append(f'JOIN {table.__tablename__} {alias} '
+                        f'ON {alias}.season = r.season '
+                        f'AND {alias}.league_match = r.league_match - 1 '
+                        f'AND {alias}.team = r.{team_column}')
+
+    for name, column, feature in features:
+        columns += [f'{name}_{team}.{column} AS {feature}_{team}'
+                    for team in ('t1', 't2')]
+
+    # The results without the rankings of both teams, e.g. the first league
+    # match, are left out as the cleaning pipeline does
+    return (f'SELECT {", ".join(columns)}\n'
+            f'FROM {Results.__tablename__} r\n' + '\n'.join(joins))
+
+def create_feature_view(engine : Engine) -> None:
+    """
+    Creates the feature view and the unique index needed to refresh it
+    concurrently
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f'CREATE MATERIALIZED VIEW IF NOT EXISTS '
+                                f'{FEATURE_VIEW} AS\n{get_feature_view_sql()}'))
+        connection.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS '
+                                f'ix_{FEATURE_VIEW}_key ON {FEATURE_VIEW} '
+                                f'(season, league_match, team_1, team_2)'))
+
+    logger.info('Migrations: feature view created')
+
+def drop_feature_view(engine : Engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP MATERIALIZED VIEW IF EXISTS {FEATURE_VIEW}'))
+
+def refresh_feature_view(engine : Engine, concurrently : bool = True) -> bool:
+    """
+    Refreshes the feature view after new data is ingested. Concurrent
+    refreshes do not block the reads of the view.
+
+    Returns
+    -------
+    bool
+        Whether the view exists and was refreshed
+    """
+    with engine.begin() as connection:
+        exists = connection.execute(text('SELECT 1 FROM pg_matviews '
+                                        'WHERE matviewname = :name'),
+                                    {'name': FEATURE_VIEW}).first()
+
+        if exists is None:
+            return False
+
+        concurrently = 'CONCURRENTLY ' if concurrently else ''
+        connection.execute(text(f'REFRESH MATERIALIZED VIEW {concurrently}'
+                                f'{FEATURE_VIEW}'))
+
+    logger.info('Migrations: feature view refreshed')
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Database migrations')
+    parser.add_argument('-c', '--config_file', type=str,
+                        default=os.path.join(CODE_DIR, 'db/db_config.yml'),
+                        help='Database config file')
+    parser.add_argument('--feature-view', action='store_true',
+                        help='Creates the materialized feature view')
+    parser.add_argument('--refresh-feature-view', action='store_true',
+                        help='Refreshes the materialized feature view')
+    parser.add_argument('--partition-by-season', type=int, nargs=2,
+                        metavar=('FIRST_SEASON', 'LAST_SEASON'),
+                        help='Partitions the tables by season range, it '
+                            'requires PostgreSQL 11 or newer')
+    parser.add_argument('--partition-size', type=int, default=5,
+                        help='Seasons per partition')
+    parser.add_argument('--fix-results-orientation', action='store_true',
+                        help='Fixes the home team and outcome of the second '
+                            'round results scraped before team_1 was always '
+                            'the home team')
+    args = parser.parse_args()
+
+    engine = get_engine(get_config(args.config_file))
+
+    # The partitioned tables are created before create_all, which skips
+    # the existing tables
+    if args.partition_by_season:
+        partition_by_season(engine, *args.partition_by_season,
+                            size=args.partition_size)
+
+    create_schema(args.config_file)
+
+    if args.fix_results_orientation:
+        fix_results_orientation(engine)
+        refresh_feature_view(engine)
+
+    if args.feature_view:
+        create_feature_view(engine)
+
+    if args.refresh_feature_view:
+        refresh_feature_view(engine)
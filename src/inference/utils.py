@@ -3,8 +3,12 @@ from src.config.config import CODE_DIR, DATA_DIR
 from src.config.logger_config import logger
 from src.scraper.scraper import Scraper
 from src.scraper.utils import DataParser
+from src.preprocessing.cleaning_preprocesses import ValidateRankingCoverage
 from src.preprocessing.config import RANKING_COLS, RESULTS_COLS
+from src.preprocessing.data_retriever import DataRetriever
 from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.ratings import get_required_rating
+from src.preprocessing.model_preprocessing import compile_pipeline
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -16,12 +20,17 @@ import boto3
 import json
 import glob
 
-def get_last_data():
+def get_last_data(rankings_from_db: bool = True):
     scraper_config = Path(CODE_DIR, 'inference/scraper_inference_config.yaml')
 
     with open(scraper_config) as file:
         config = yaml.full_load(file)
 
+    # The rankings before the round are read from the database, so only the
+    # results page is scraped
+    if rankings_from_db:
+        config['scrape_home_away'] = False
+
     # Set the scraper config
     scraper = Scraper(config)
 
@@ -31,6 +40,10 @@ def get_last_data():
     # Parse the data
     parser = DataParser()
     general_ranking, results = parser.parse_general_data(data['general'])
+
+    if rankings_from_db:
+        return get_round_data(results)
+
     home_ranking = parser.parse_home_away_data(data['home'])
     away_ranking = parser.parse_home_away_data(data['away'])
 
@@ -42,6 +55,19 @@ def get_last_data():
 
     return results_df, general_df, home_df, away_df
 
+def get_round_data(results):
+    results_df = pd.DataFrame(results, columns=RESULTS_COLS)
+
+    # One query per ranking table for the teams of the round
+    retriever = DataRetriever(Path(CODE_DIR, 'db/db_config.yml'))
+    general_df, home_df, away_df = retriever.get_round_rankings(results_df)
+
+    # Fails if the rankings of the previous round were not ingested yet
+    validate_rankings = ValidateRankingCoverage(general_df, home_df, away_df)
+    results_df = validate_rankings(results_df)
+
+    return results_df, general_df, home_df, away_df
+
 def create_dataframes(results, general_ranking, home_ranking, away_ranking):
     results_df = pd.DataFrame(results, columns=RESULTS_COLS)
     results_df['league_match'] = results_df['league_match']
@@ -60,17 +86,15 @@ def create_dataframes(results, general_ranking, home_ranking, away_ranking):
 def preprocess_for_inference(results_df, general_df, home_df, away_df):
     logger.info('CREATING FEATURES')
     feature_pipeline = get_feature_pipeline(general_df, home_df,
-                                            away_df)
+                                            away_df,
+                                            rating=get_required_rating())
     data = feature_pipeline(results_df)
 
     logger.info('CREATING PREPROCESSING PIPELINE')
     with open(Path(DATA_DIR, 'prep_pipeline.pkl'), 'rb') as file:
-        preprocesser_pipeline = pickle.load(file)   
-
-    data = data.drop('outcome', axis=1)
+        preprocesser_pipeline = compile_pipeline(pickle.load(file))
 
     data = preprocesser_pipeline.transform(data)
-    data = data.drop(['created_on'], axis=1)
 
     teams = (results_df['team_1'].values, results_df['team_2'].values)
 
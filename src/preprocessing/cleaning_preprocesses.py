@@ -1,4 +1,5 @@
 from typing import Dict, List
+from src.config.logger_config import logger
 from src.preprocessing.utils import FeaturePipeline
 
 import pandas as pd
@@ -65,4 +66,95 @@ class RemoveWrongOutcome():
         valid_indices = dataframe['outcome'].isin(['team_1', 'team_2', 'draw']).values
         dataframe = dataframe.loc[valid_indices, :].copy()
         
-        return dataframe
\ No newline at end of file
+        return dataframe
+
+class ValidateRankingCoverage():
+    """
+    Checks that every result has the statistics of both teams before the
+    match in all the ranking tables, so the feature preprocesses do not fail
+    halfway.
+
+    Parameters
+    ----------
+    general : pd.DataFrame
+        General ranking
+    home : pd.DataFrame
+        Home ranking
+    away : pd.DataFrame
+        Away ranking
+    drop : bool
+        Whether to remove the results without rankings instead of raising
+        an error
+
+    Attributes
+    ----------
+    _rankings : Dict[str, pd.DataFrame]
+        Ranking tables by name
+    _drop : bool
+        Whether to remove the results without rankings
+    """
+    def __init__(self, general: pd.DataFrame, home: pd.DataFrame,
+                away: pd.DataFrame, drop: bool = False) -> None:
+        self._rankings = {'general': general, 'home': home, 'away': away}
+        self._drop = drop
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        missing = find_missing_rankings(dataframe, self._rankings)
+
+        if len(missing) == 0:
+            return dataframe
+
+        logger.info(f'Preprocess: {len(missing)} results without rankings\n'
+                    f'{missing.to_string()}')
+
+        if not self._drop:
+            raise KeyError(f'{len(missing)} results without rankings')
+
+        dataframe = dataframe.drop(missing.index)
+        dataframe = dataframe.reset_index(drop=True)
+
+        return dataframe
+
+def find_missing_rankings(results: pd.DataFrame,
+                        rankings: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Finds all the results which do not have the statistics of any of their
+    teams in the previous league match of any ranking table
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        Results dataframe
+    rankings : Dict[str, pd.DataFrame]
+        Ranking tables by name
+
+    Returns
+    -------
+    pd.DataFrame
+        Season, league match and teams of the invalid results, indexed as in
+        the results dataframe, along with the missing rankings as
+        'table:team' strings
+    """
+    keys = ['season', 'league_match', 'team']
+    missing = pd.DataFrame(False, index=results.index, columns=[
+        f'{table}:{team}' for table in rankings for team in ('team_1', 'team_2')
+    ])
+
+    for table, ranking in rankings.items():
+        # Rankings keyed by the league match they precede
+        ranking = ranking[keys].drop_duplicates()
+        ranking = ranking.assign(league_match=ranking['league_match'] + 1)
+
+        for team in ('team_1', 'team_2'):
+            data = results[['season', 'league_match', team]].merge(
+                        ranking, how='left', indicator=True,
+                        left_on=['season', 'league_match', team],
+                        right_on=keys)
+            missing[f'{table}:{team}'] = (data['_merge'] == 'left_only').values
+
+    invalid = missing.any(axis=1).values
+    data = results.loc[invalid, ['season', 'league_match', 'team_1', 'team_2']]
+    data['missing'] = [','.join(missing.columns[row]) for row
+                        in missing.values[invalid]]
+
+    return data
\ No newline at end of file
@@ -1,3 +1,5 @@
+import pandas as pd
+
 RESULTS_COLS = ['season', 'league_match', 'home', 'team_1', 'team_2',
                     'outcome']
 RANKING_COLS = ['season', 'league_match', 'rank_pos', 'team',
@@ -10,4 +12,55 @@ FEATURES_TO_DROP = [
     'home_draws_t1', 'home_draws_t2', 'away_draws_t1', 'away_draws_t2', 
     'general_draws_t1', 'general_draws_t2', 'home_losses_t1', 'home_losses_t2',
     'away_losses_t1', 'away_losses_t2', 'general_losses_t1', 'general_losses_t2'
-]
\ No newline at end of file
+]
+
+# Elo ratings of both teams before the match, see ComputeEloRating
+RATING_FEATURES = ['elo_t1', 'elo_t2']
+
+# Statistics retrieved from the ranking tables for both teams, in the same
+# order as the features are created: (ranking table, ranking column, feature)
+RANKING_FEATURES = [
+    ('general', 'rank_pos', 'rank'),
+    ('general', 'wins', 'general_wins'),
+    ('home', 'wins', 'home_wins'),
+    ('away', 'wins', 'away_wins'),
+    ('general', 'draws', 'general_draws'),
+    ('home', 'draws', 'home_draws'),
+    ('away', 'draws', 'away_draws'),
+    ('general', 'losses', 'general_losses'),
+    ('home', 'losses', 'home_losses'),
+    ('away', 'losses', 'away_losses'),
+    ('general', 'goals_scored', 'general_goals_scored'),
+    ('home', 'goals_scored', 'home_goals_scored'),
+    ('away', 'goals_scored', 'away_goals_scored'),
+    ('general', 'goals_conceded', 'general_goals_conceded'),
+    ('home', 'goals_conceded', 'home_goals_conceded'),
+    ('away', 'goals_conceded', 'away_goals_conceded'),
+]
+
+# Dtypes of the retrieved data. The team columns share the same categories,
+# which are set at retrieval time. The other categories are fixed, so every
+# chunk of data gets the same dtype. 'NA' is the outcome of the matches not
+# played yet.
+RESULTS_DTYPES = {
+    'season': 'int16', 'league_match': 'int8',
+    'home': pd.CategoricalDtype(['team_1', 'team_2']),
+    'team_1': 'category', 'team_2': 'category',
+    'outcome': pd.CategoricalDtype(['NA', 'draw', 'team_1', 'team_2'])
+}
+RANKING_DTYPES = {
+    'season': 'int16', 'league_match': 'int8', 'rank_pos': 'int8',
+    'team': 'category', 'matches': 'int8', 'wins': 'int8', 'draws': 'int8',
+    'losses': 'int8', 'goals_scored': 'int16', 'goals_conceded': 'int16',
+    'goals_difference': 'int16'
+}
+TEAM_COLS = ['team', 'team_1', 'team_2']
+
+# Ratio features computed dividing a count by the league match, in the order
+# they are created: (ratio feature, count feature)
+RATIO_FEATURES = [
+    (f'{venue}_{ratio}_ratio_{team}', f'{venue}_{count}_{team}')
+    for ratio, count in (('win', 'wins'), ('draw', 'draws'), ('loss', 'losses'))
+    for venue in ('home', 'away')
+    for team in ('t1', 't2')
+]
@@ -1,27 +1,301 @@
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 import pandas as pd
 
-from src.preprocessing.config import RANKING_COLS, RESULTS_COLS
+from src.preprocessing.config import (
+    RANKING_COLS,
+    RANKING_DTYPES,
+    RANKING_FEATURES,
+    RESULTS_COLS
+)
+from src.preprocessing.ranking_tensor import RankingTensor, get_ranking_tensors
+from src.preprocessing.utils import (
+    apply_dtypes,
+    get_teams,
+    get_teams_dtype,
+    group_by_season
+)
 from src.db.manager import DBManager
+from src.db.migrations import FEATURE_VIEW, FEATURE_VIEW_COLUMNS
 from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
 
+# Table mapping and columns of the results and the ranking tables
+TABLES = {
+    'results': (Results, RESULTS_COLS),
+    'general': (GeneralRanking, RANKING_COLS),
+    'home': (HomeRanking, RANKING_COLS),
+    'away': (AwayRanking, RANKING_COLS)
+}
+
+# Columns containing the teams' names
+TEAM_COLUMNS = [Results.team_1, Results.team_2, GeneralRanking.team,
+                HomeRanking.team, AwayRanking.team]
+
 class DataRetriever:
     def __init__(self, db_config : str) -> None:
         self._db_manager = DBManager(db_config)
 
-    def get_historical_data(self):
+    def get_teams_dtype(self) -> pd.CategoricalDtype:
+        """
+        Gets the dtype of the team columns with all the teams of the
+        database, so the data streamed season by season gets the same
+        categories. It scans the team columns of the whole history, the
+        other reads take the teams of the data they read.
+        """
+        return get_teams_dtype(self._db_manager.select_distinct(TEAM_COLUMNS))
+
+    def get_historical_data(self, columns: Optional[Dict[str, List[str]]] = None,
+                            method: str = 'orm', concurrent: bool = False):
+        """
+        Retrieves the results and the ranking tables
+
+        Parameters
+        ----------
+        columns : Dict[str, List[str]], optional
+            Columns to retrieve from the 'results', 'general', 'home' and
+            'away' tables. All the columns are retrieved by default.
+        method : str
+            'orm' creates a mapped object per row, 'sql' and 'copy' read the
+            tables as dataframes with DBManager.read_dataframe
+        concurrent : bool
+            Whether to read the four tables at the same time, each one in a
+            thread with its own pooled connection
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+            Results, general, home and away rankings
+        """
+        if columns is not None or method != 'orm' or concurrent:
+            return self._get_table_data(columns, method, concurrent)
+
         results = self._db_manager.select(Results)
         general_ranking = self._db_manager.select(GeneralRanking)
         home_ranking = self._db_manager.select(HomeRanking)
         away_ranking = self._db_manager.select(AwayRanking)
 
         results_df = self.get_result_dataframe(results)
-        general_df, home_df, away_df = self.get_ranking_dataframes([general_ranking,
-                                                                    home_ranking,
-                                                                    away_ranking])
+        rankings = self.get_ranking_dataframes([general_ranking,
+                                                home_ranking,
+                                                away_ranking])
+
+        # The whole tables have all the teams
+        results_df, rankings = apply_dtypes(results_df, list(rankings))
+        general_df, home_df, away_df = rankings
+
+        return results_df, general_df, home_df, away_df
+
+    def _get_table_data(self, columns: Optional[Dict[str, List[str]]],
+                        method: str, concurrent: bool = False):
+        def read_table(name):
+            table, table_columns = TABLES[name]
+
+            if columns is not None:
+                table_columns = columns[name]
+
+            if method == 'orm':
+                rows = self._db_manager.select_columns(table, table_columns)
+
+                return pd.DataFrame(rows, columns=table_columns)
+
+            return self._db_manager.read_dataframe(table, table_columns, method)
+
+        if concurrent:
+            # The wall time is bounded by the slowest table
+            with ThreadPoolExecutor(max_workers=len(TABLES)) as executor:
+                data = dict(zip(TABLES, executor.map(read_table, TABLES)))
+        else:
+            data = {name: read_table(name) for name in TABLES}
+
+        # The whole tables have all the teams
+        results_df, rankings = apply_dtypes(data['results'],
+                                            [data['general'], data['home'],
+                                            data['away']])
+        general_df, home_df, away_df = rankings
 
         return results_df, general_df, home_df, away_df
 
+    def stream_historical_data(self, columns: Optional[Dict[str, List[str]]] = None,
+                                chunk_size: int = 10000
+                                ) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame,
+                                                    pd.DataFrame, pd.DataFrame]]:
+        """
+        Retrieves the results and the ranking tables season by season
+        through server-side cursors, so the memory is bounded by the chunk
+        size and the largest season instead of the whole history
+
+        Parameters
+        ----------
+        columns : Dict[str, List[str]], optional
+            Columns to retrieve from the 'results', 'general', 'home' and
+            'away' tables. All the columns are retrieved by default.
+        chunk_size : int
+            Rows fetched from the database at once
+
+        Yields
+        ------
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+            Results, general, home and away rankings of a season
+        """
+        # The same categories for every season
+        teams_dtype = self.get_teams_dtype()
+        streams = {}
+
+        for name, (table, table_columns) in TABLES.items():
+            if columns is not None:
+                table_columns = columns[name]
+
+            streams[name] = (group_by_season(self._db_manager.stream_dataframes(
+                                                table, table_columns,
+                                                chunk_size)),
+                            table_columns)
+
+        results_stream, _ = streams.pop('results')
+        # Next season of every ranking stream not yielded yet
+        pending = {name: next(stream, None)
+                    for name, (stream, _) in streams.items()}
+
+        for season, results_df in results_stream:
+            rankings = []
+
+            for name, (stream, table_columns) in streams.items():
+                # The ranking seasons without results are skipped
+                while pending[name] is not None and pending[name][0] < season:
+                    pending[name] = next(stream, None)
+
+                if pending[name] is not None and pending[name][0] == season:
+                    rankings.append(pending[name][1])
+                    pending[name] = next(stream, None)
+                else:
+                    rankings.append(pd.DataFrame(columns=table_columns))
+
+            results_df, rankings = apply_dtypes(results_df, rankings,
+                                                teams_dtype)
+            general_df, home_df, away_df = rankings
+
+            yield results_df, general_df, home_df, away_df
+
+    def get_data_since(self, season: int, league_match: int,
+                        columns: Optional[Dict[str, List[str]]] = None,
+                        method: str = 'sql',
+                        teams: Optional[List[str]] = None):
+        """
+        Retrieves the results played after a (season, league_match)
+        watermark and the rankings needed to compute their features. Only
+        the rows after the watermark are read, also to get the teams.
+
+        Parameters
+        ----------
+        season : int
+            Season of the watermark
+        league_match : int
+            League match of the watermark
+        columns : Dict[str, List[str]], optional
+            Columns to retrieve from the 'results', 'general', 'home' and
+            'away' tables. All the columns are retrieved by default.
+        method : str
+            'sql' or 'copy', see DBManager.read_dataframe
+        teams : List[str], optional
+            Teams read before, e.g. the categories of the feature table, so
+            the new data gets the same categories plus the new teams
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+            Results, general, home and away rankings
+        """
+        data = {}
+
+        for name, (table, table_columns) in TABLES.items():
+            if columns is not None:
+                table_columns = columns[name]
+
+            # The first new league match uses the rankings of the watermark
+            data[name] = self._db_manager.get_data_since(
+                                table, season, league_match, table_columns,
+                                inclusive=name != 'results', method=method)
+
+        rankings = [data['general'], data['home'], data['away']]
+        teams_dtype = None
+
+        if teams is not None:
+            teams_dtype = get_teams_dtype(list(teams)
+                                        + get_teams(data['results'], rankings))
+
+        results_df, rankings = apply_dtypes(data['results'], rankings,
+                                            teams_dtype)
+        general_df, home_df, away_df = rankings
+
+        return results_df, general_df, home_df, away_df
+
+    def get_feature_view(self, columns: Optional[List[str]] = None,
+                        method: str = 'sql') -> pd.DataFrame:
+        """
+        Retrieves the results with their ranking features computed in the
+        database by the materialized feature view, see src.db.migrations
+
+        Parameters
+        ----------
+        columns : List[str], optional
+            Columns to retrieve, all the view columns by default
+        method : str
+            'sql' or 'copy', see DBManager.read_dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            Results and ranking features, as returned by the feature pipeline
+        """
+        if columns is None:
+            columns = FEATURE_VIEW_COLUMNS
+
+        data = self._db_manager.read_view(FEATURE_VIEW, columns, method)
+        # The whole view has all the teams
+        data, _ = apply_dtypes(data, [])
+
+        # Every feature keeps the dtype of its ranking column
+        dtypes = {f'{feature}_{team}': RANKING_DTYPES[column]
+                    for _, column, feature in RANKING_FEATURES
+                    for team in ('t1', 't2')}
+
+        return data.astype({column: dtype for column, dtype in dtypes.items()
+                            if column in data.columns})
+
+    def get_round_rankings(self, results: pd.DataFrame
+                            ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Retrieves only the rankings needed to compute the features of the
+        given results, with one query per ranking table
+
+        Parameters
+        ----------
+        results : pd.DataFrame
+            Results whose features will be computed, e.g. the next round
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+            General, home and away rankings of both teams before each match.
+            The team categories are the teams of the given results.
+        """
+        # The statistics before a match are the ones of the previous round
+        keys = [(int(season), int(league_match) - 1, str(team))
+                for column in ('team_1', 'team_2')
+                for season, league_match, team in zip(results['season'],
+                                                        results['league_match'],
+                                                        results[column])]
+
+        rankings = [self._db_manager.select_rankings(table, keys)
+                    for table in (GeneralRanking, HomeRanking, AwayRanking)]
+        rankings = list(self.get_ranking_dataframes(rankings))
+
+        # The dtypes policy of the other reads, with the teams of the round
+        # instead of scanning the teams of the whole database
+        _, rankings = apply_dtypes(results, rankings)
+        general_df, home_df, away_df = rankings
+
+        return general_df, home_df, away_df
+
     def get_result_dataframe(self, raw_results : List[Tuple]) -> pd.DataFrame:
         data = []
 
@@ -50,4 +324,10 @@ class DataRetriever:
 
         dfs = (pd.DataFrame(dataset, columns=RANKING_COLS) for dataset in new_datasets)
 
-        return dfs
\ No newline at end of file
+        return dfs
+
+    def get_ranking_tensors(self, datasets: List[List[Tuple]]
+                            ) -> Dict[str, RankingTensor]:
+        general_df, home_df, away_df = self.get_ranking_dataframes(datasets)
+
+        return get_ranking_tensors(general_df, home_df, away_df)
\ No newline at end of file
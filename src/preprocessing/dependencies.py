@@ -0,0 +1,103 @@
+from typing import Dict, List, Tuple
+
+from src.config.config import VARIABLES
+from src.preprocessing.config import (
+    RANKING_FEATURES,
+    RATIO_FEATURES,
+    RESULTS_COLS
+)
+
+# Columns needed to identify a ranking row
+RANKING_KEYS = ['season', 'league_match', 'team']
+
+def get_required_features(variables: List[str] = VARIABLES) -> List[str]:
+    """
+    Gets the columns the feature pipeline must create to compute the final
+    variables
+
+    Parameters
+    ----------
+    variables : List[str]
+        Final variables used by the models
+
+    Returns
+    -------
+    List[str]
+        Required columns, the ratios are replaced by their counts
+    """
+    ratios = dict(RATIO_FEATURES)
+    features = [ratios.get(variable, variable) for variable in variables]
+
+    return list(dict.fromkeys(features))
+
+def get_required_ranking_features(variables: List[str] = VARIABLES
+                                ) -> List[Tuple[str, str, str]]:
+    """
+    Gets the ranking features needed to compute the final variables
+
+    Parameters
+    ----------
+    variables : List[str]
+        Final variables used by the models
+
+    Returns
+    -------
+    List[Tuple[str, str, str]]
+        Subset of RANKING_FEATURES as (ranking table, ranking column, feature)
+    """
+    features = set(get_required_features(variables))
+
+    return [(table, column, feature)
+            for table, column, feature in RANKING_FEATURES
+            if {f'{feature}_t1', f'{feature}_t2'} & features]
+
+def get_required_columns(variables: List[str] = VARIABLES
+                        ) -> Dict[str, List[str]]:
+    """
+    Gets the database columns needed to compute the final variables
+
+    Parameters
+    ----------
+    variables : List[str]
+        Final variables used by the models
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        Columns of the 'results', 'general', 'home' and 'away' tables
+    """
+    # The feature preprocesses read the teams by position, so the results
+    # keep all their columns
+    columns = {'results': RESULTS_COLS}
+    ranking_features = get_required_ranking_features(variables)
+
+    for table in ('general', 'home', 'away'):
+        statistics = [column for name, column, _ in ranking_features
+                        if name == table]
+        columns[table] = RANKING_KEYS + list(dict.fromkeys(statistics))
+
+    return columns
+
+def get_unrequired_features(variables: List[str] = VARIABLES) -> List[str]:
+    """
+    Gets the columns of the feature pipeline which are not computed nor
+    retrieved because no final variable needs them
+
+    Parameters
+    ----------
+    variables : List[str]
+        Final variables used by the models
+
+    Returns
+    -------
+    List[str]
+        Columns left out by the projection
+    """
+    required = get_required_ranking_features(variables)
+    features = [f'{feature}_{team}' for table, column, feature in RANKING_FEATURES
+                if (table, column, feature) not in required
+                for team in ('t1', 't2')]
+    results = [column for column in RESULTS_COLS
+                if column not in get_required_columns(variables)['results']]
+
+    return results + features
@@ -2,18 +2,89 @@ import pandas as pd
 import numpy as np
 
 from abc import ABC, abstractmethod
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional, Union
 from src.config.logger_config import logger
+from src.preprocessing.config import RANKING_FEATURES
+from src.preprocessing.ranking_tensor import RankingTensor, get_ranking_tensors
+from src.preprocessing.ratings import EloRating
 from src.preprocessing.utils import FeaturePipeline
 
+class RankingIndex():
+    """
+    Hash index over a ranking table to retrieve a team's statistics
+    for a certain season and league match in constant time.
+
+    Parameters
+    ----------
+    ranking_df : pd.DataFrame
+        DataFrame containing the whole teams statistics
+    keys : List[str]
+        Columns which identify a ranking row
+
+    Attributes
+    ----------
+    ranking_df : pd.DataFrame
+        DataFrame containing the whole teams statistics
+    _values : np.ndarray
+        Ranking rows as an array
+    _positions : dict
+        Dictionary mapping each key to its row position
+    """
+    def __init__(self, ranking_df: pd.DataFrame,
+                keys: List[str] = ['season', 'league_match', 'team']) -> None:
+        self.ranking_df = ranking_df
+        self._values = ranking_df.values
+
+        key_values = zip(*(ranking_df[key].values for key in keys))
+        self._positions = {}
+
+        # Keeps the first occurrence of duplicated keys, as the boolean
+        # masks used to do
+        for position, key in enumerate(key_values):
+            self._positions.setdefault(key, position)
+
+    def get(self, *key) -> np.ndarray:
+        """
+        Retrieve the ranking row for a given key
+
+        Parameters
+        ----------
+        key : tuple
+            Values of the key columns, e.g. (season, league_match, team)
+
+        Returns
+        -------
+        array like of shape (, columns)
+            Array containing the ranking row
+
+        Raises
+        ------
+        KeyError
+            If there is not any ranking row for the given key
+        """
+        return self._values[self._positions[key]]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
 class FeaturePreprocess(ABC):
     """
     Abstract class which defines some common methods to the
     preprocesses intended to create features.
     """
-    def __init__(self, ranking_df: pd.DataFrame,
+    def __init__(self, ranking_df: Union[pd.DataFrame, RankingIndex],
                 columns: List[str], new_columns: List[str]):
-        self.ranking_df = ranking_df
+        # The index can be shared between preprocesses that use the same
+        # ranking table so it is only built once
+        if isinstance(ranking_df, RankingIndex):
+            self.ranking_index = ranking_df
+        else:
+            self.ranking_index = RankingIndex(ranking_df)
+
+        self.ranking_df = self.ranking_index.ranking_df
         self.columns = columns
         self.new_columns = new_columns
 
@@ -41,11 +112,9 @@ class FeaturePreprocess(ABC):
         # Subtracts 1 to the league match because we want to retrieve
         # the statistics the teams have before playing a certain match
         league_match -= 1
-        # Retrieves the data from the dataframe
+        # Retrieves the data from the ranking index
         try:
-            data = self.ranking_df[(self.ranking_df['season'] == season) 
-                        & (self.ranking_df['league_match'] == league_match) 
-                        & (self.ranking_df['team'] == team)].values[0]
+            data = self.ranking_index.get(season, league_match, team)
         except Exception as ex:
             logger.info(f'Preprocess: Error on {season} - {league_match}, {team}')
             raise ex
@@ -171,83 +240,683 @@ class ComputeGoalsConceded(FeaturePreprocess):
         
         return int(data[9])
 
-def get_feature_pipeline(general, home, away):
-    # Compute general, home and away wins
-    wins_pipeline = FeaturePipeline([
-        ComputeWins(general,
-                    ['team_1', 'team_2'],
-                    ['general_wins_t1', 'general_wins_t2']),
-        ComputeWins(home,
-                    ['team_1', 'team_2'],
-                    ['home_wins_t1', 'home_wins_t2']),
-        ComputeWins(away,
-                    ['team_1', 'team_2'],
-                    ['away_wins_t1', 'away_wins_t2']),
-    ])
-    # General, home and away draws
-    draws_pipeline = FeaturePipeline([
-        ComputeDraws(general,
-                    ['team_1', 'team_2'],
-                    ['general_draws_t1', 'general_draws_t2']),
-        ComputeDraws(home,
-                    ['team_1', 'team_2'],
-                        ['home_draws_t1', 'home_draws_t2']),
-        ComputeDraws(away,
-                    ['team_1', 'team_2'],
-                    ['away_draws_t1', 'away_draws_t2']),
-    ])
-    # General, home and away losses
-    loss_pipeline = FeaturePipeline([
-        ComputeLosses(general,
-                    ['team_1', 'team_2'],
-                    ['general_losses_t1', 'general_losses_t2']),
-        ComputeLosses(home,
-                    ['team_1', 'team_2'],
-                    ['home_losses_t1', 'home_losses_t2']),
-        ComputeLosses(away,
-                    ['team_1', 'team_2'],
-                    ['away_losses_t1', 'away_losses_t2']),      
-    ])
-    # General, home and away goals scored
-    goals_scored_pipeline = FeaturePipeline([
-        ComputeGoalsScored(
-                general,
-                ['team_1', 'team_2'],
-                ['general_goals_scored_t1', 'general_goals_scored_t2']),
-        ComputeGoalsScored(
-                home,
-                ['team_1', 'team_2'],
-                ['home_goals_scored_t1', 'home_goals_scored_t2']),
-        ComputeGoalsScored(
-                away,
-                ['team_1', 'team_2'],
-                ['away_goals_scored_t1', 'away_goals_scored_t2'])
+class ComputeRankingStatistics(FeaturePreprocess):
+    """
+    Retrieves several statistics from a ranking table with a single lookup
+    per team and match.
+
+    Parameters
+    ----------
+    ranking_df : pd.DataFrame or RankingIndex
+        Ranking table
+    columns : List[str]
+        Columns containing the teams
+    statistics : Dict[str, List[str]]
+        Dictionary mapping each ranking column to the new columns, one per
+        team column
+    """
+    def __init__(self, ranking_df: Union[pd.DataFrame, RankingIndex],
+                columns: List[str], statistics: Dict[str, List[str]]):
+        new_columns = [new_column for new_columns in statistics.values()
+                                    for new_column in new_columns]
+        super().__init__(ranking_df, columns, new_columns)
+
+        self.statistics = statistics
+        self._positions = [self.ranking_df.columns.get_loc(column)
+                            for column in statistics]
+
+    def _compute_feature(self, df_row: np.ndarray, team: str) -> List[int]:
+        data = self._get_team_data(df_row, self.ranking_df, team)
+
+        return [int(data[position]) for position in self._positions]
+
+    def _compute_features(self, df_row: np.ndarray) -> List[int]:
+        teams_data = [self._compute_feature(df_row, team)
+                        for team in self.columns]
+
+        # Sorted as the new columns: every team for each statistic
+        return [team_data[i] for i in range(len(self._positions))
+                            for team_data in teams_data]
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        features = [self._compute_features(df_row)
+                    for df_row in dataframe.values]
+        features = np.array(features, dtype=np.int64).reshape(
+                                        len(dataframe), len(self.new_columns))
+
+        # Every new column keeps the dtype of its ranking column
+        dtypes = [self.ranking_df[column].dtype
+                    for column, new_columns in self.statistics.items()
+                    for _ in new_columns]
+
+        for i, (new_column, dtype) in enumerate(zip(self.new_columns, dtypes)):
+            dataframe[new_column] = features[:, i].astype(dtype)
+
+        return dataframe
+
+class ComputeTensorStatistics():
+    """
+    Retrieves several statistics from a ranking tensor for all the matches
+    at once using fancy indexing.
+
+    Parameters
+    ----------
+    tensor : RankingTensor
+        Ranking table as a dense tensor
+    columns : List[str]
+        Columns containing the teams
+    statistics : Dict[str, List[str]]
+        Dictionary mapping each ranking column to the new columns, one per
+        team column
+
+    Attributes
+    ----------
+    tensor : RankingTensor
+        Ranking table as a dense tensor
+    columns : List[str]
+        Columns containing the teams
+    statistics : Dict[str, List[str]]
+        Dictionary mapping each ranking column to the new columns
+    """
+    def __init__(self, tensor: RankingTensor, columns: List[str],
+                statistics: Dict[str, List[str]]) -> None:
+        self.tensor = tensor
+        self.columns = columns
+        self.statistics = statistics
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        stats = list(self.statistics)
+        # The statistics before playing a match are the ones from the
+        # previous league match
+        league_matches = dataframe['league_match'].values - 1
+
+        for i, column in enumerate(self.columns):
+            try:
+                values = self.tensor.get(dataframe['season'].values,
+                                        league_matches,
+                                        dataframe[column].values, stats)
+            except KeyError as ex:
+                logger.info(f'Preprocess: Error on {column}: {ex}')
+                raise ex
+
+            for j, stat in enumerate(stats):
+                dtype = self.tensor.dtypes[stat]
+                dataframe[self.statistics[stat][i]] = values[:, j].astype(dtype)
+
+        return dataframe
+
+class ComputeStreaks():
+    """
+    Computes the wins, draws and losses streaks of both teams before each
+    match from the results history.
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        Results history used to compute the streaks
+
+    Attributes
+    ----------
+    _streaks : pd.DataFrame
+        Streaks of every team after each of its matches
+    """
+    STREAKS = ['wins_streak', 'draws_streak', 'losses_streak']
+
+    def __init__(self, results: pd.DataFrame) -> None:
+        self._streaks = self._compute_streaks(get_team_matches(results))
+
+    def _compute_streaks(self, matches: pd.DataFrame) -> pd.DataFrame:
+        """
+        Computes the streaks after each match with grouped cumulative sums
+
+        Parameters
+        ----------
+        matches : pd.DataFrame
+            Matches of every team, one row per team and match
+
+        Returns
+        -------
+        pd.DataFrame
+            Streaks after each match, sorted by league match
+        """
+        matches = matches.sort_values(['season', 'team', 'league_match'])
+        streaks = matches[['season', 'league_match', 'team']].copy()
+        groups = [matches['season'].values, matches['team'].values]
+
+        for streak, result in zip(self.STREAKS, ('win', 'draw', 'loss')):
+            is_result = (matches['result'] == result).values.astype(np.int64)
+            # Every different result starts a new run, the streak is the
+            # number of consecutive results within the run
+            run = pd.Series(1 - is_result).groupby(groups).cumsum().values
+            streaks[streak] = pd.Series(is_result).groupby(
+                                        groups + [run]).cumsum().values
+
+        return streaks.sort_values('league_match', kind='stable')
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        for team, suffix in (('team_1', 't1'), ('team_2', 't2')):
+            data = get_previous_match_values(dataframe, team, self._streaks)
+
+            for streak in self.STREAKS:
+                dataframe[f'{streak}_{suffix}'] = data[streak].values
+
+        return dataframe
+
+class ComputeForm(ABC):
+    """
+    Abstract class which defines the preprocesses intended to create the
+    recent form features: the sum of a statistic over the last N matches of
+    each team within the season.
+
+    The cumulative sum of the statistic is computed once per team, so every
+    window is the difference between the cumulative sum after the last
+    match and N matches before, no matter how many windows are requested.
+    The last cumulative sums of every team are kept, so the form of a new
+    round is computed from them with update, without processing the
+    previous matches again.
+
+    Parameters
+    ----------
+    matches : pd.DataFrame
+        Matches of every team as returned by get_team_matches
+    windows : List[int]
+        Number of matches of each window
+    venue : str, optional
+        Only takes into account the 'home' or 'away' matches
+
+    Attributes
+    ----------
+    windows : List[int]
+        Number of matches of each window
+    venue : str, optional
+        Only takes into account the 'home' or 'away' matches
+    _form : pd.DataFrame
+        Form of every team after each of its matches
+    _state : pd.DataFrame
+        Cumulative sums of the last matches of every team and season, as
+        many as the longest window
+    """
+    def __init__(self, matches: pd.DataFrame, windows: List[int] = [3, 5, 10],
+                venue: Optional[str] = None) -> None:
+        self.windows = windows
+        self.venue = venue
+        self._form = None
+        self._state = pd.DataFrame({'season': np.array([], dtype=np.int64),
+                                    'team': np.array([], dtype=object),
+                                    'cumulative': np.array([], dtype=np.float64)})
+
+        self.update(matches)
+
+    def update(self, matches: pd.DataFrame) -> 'ComputeForm':
+        """
+        Extends the form with new matches, played after the ones of each
+        team already processed
+
+        Parameters
+        ----------
+        matches : pd.DataFrame
+            New matches of every team as returned by get_team_matches
+
+        Returns
+        -------
+        ComputeForm
+            The preprocess itself
+        """
+        if self.venue is not None:
+            matches = matches[matches['venue'] == self.venue]
+
+        form = self._compute_form(matches)
+
+        if self._form is not None:
+            form = pd.concat([self._form, form], ignore_index=True)
+
+        self._form = form.sort_values('league_match', kind='stable')
+
+        return self
+
+    @property
+    @abstractmethod
+    def statistic(self) -> str:
+        pass
+
+    def _get_feature_name(self, window: int) -> str:
+        prefix = f'{self.venue}_' if self.venue is not None else ''
+
+        return f'{prefix}form_{self.statistic}_last{window}'
+
+    def _compute_form(self, matches: pd.DataFrame) -> pd.DataFrame:
+        """
+        Computes the sliding window sums after each new match, starting from
+        the stored cumulative sums, and moves the state forward
+
+        Parameters
+        ----------
+        matches : pd.DataFrame
+            New matches of every team
+
+        Returns
+        -------
+        pd.DataFrame
+            Window sums after each match, sorted by league match
+        """
+        matches = matches.sort_values(['season', 'team', 'league_match'])
+        form = matches[['season', 'league_match', 'team']].copy()
+        groups = [matches['season'].values, matches['team'].values]
+
+        # The cumulative sums continue from the last stored ones
+        offsets = self._state.groupby(['season', 'team'])['cumulative'].last()
+        offsets = offsets.reindex(pd.MultiIndex.from_arrays(groups),
+                                fill_value=0).values
+        cumulative = pd.Series(matches[self.statistic].values).groupby(
+                                                groups).cumsum().values + offsets
+
+        # The stored sums go first, so the shifts reach the previous matches
+        data = pd.concat([self._state, pd.DataFrame({
+                            'season': groups[0], 'team': groups[1],
+                            'cumulative': cumulative})], ignore_index=True)
+        data = data.sort_values(['season', 'team'], kind='stable')
+        data_groups = [data['season'].values, data['team'].values]
+        is_new = data.index.values >= len(self._state)
+
+        for window in self.windows:
+            previous = data['cumulative'].groupby(data_groups).shift(window)
+            previous = previous.fillna(0).values[is_new]
+            form[self._get_feature_name(window)] = cumulative - previous
+
+        self._state = data.groupby(data_groups).tail(max(self.windows)).\
+                            reset_index(drop=True)
+
+        return form
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        for team, suffix in (('team_1', 't1'), ('team_2', 't2')):
+            data = get_previous_match_values(dataframe, team, self._form)
+
+            for window in self.windows:
+                feature = self._get_feature_name(window)
+                dataframe[f'{feature}_{suffix}'] = data[feature].values
+
+        return dataframe
+
+class ComputeFormPoints(ComputeForm):
+    statistic = 'points'
+
+class ComputeFormGoalsScored(ComputeForm):
+    statistic = 'goals_scored'
+
+class ComputeFormGoalsConceded(ComputeForm):
+    statistic = 'goals_conceded'
+
+class ComputeEloRating():
+    """
+    Retrieves the Elo rating of both teams before each match
+
+    Parameters
+    ----------
+    rating : EloRating
+        Elo rating updated with the results history
+    columns : List[str]
+        Columns containing the teams
+    new_columns : List[str]
+        New columns, one per team column
+
+    Attributes
+    ----------
+    rating : EloRating
+        Elo rating updated with the results history
+    columns : List[str]
+        Columns containing the teams
+    new_columns : List[str]
+        New columns, one per team column
+    """
+    def __init__(self, rating: EloRating,
+                columns: List[str] = ['team_1', 'team_2'],
+                new_columns: List[str] = ['elo_t1', 'elo_t2']) -> None:
+        self.rating = rating
+        self.columns = columns
+        self.new_columns = new_columns
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        for column, new_column in zip(self.columns, self.new_columns):
+            dataframe[new_column] = self.rating.get_ratings(
+                                            dataframe['season'].values,
+                                            dataframe['league_match'].values,
+                                            dataframe[column].values)
+
+        return dataframe
+
+def get_previous_match_values(dataframe: pd.DataFrame, team: str,
+                            values: pd.DataFrame) -> pd.DataFrame:
+    """
+    Retrieves the values after the last match each team played before the
+    league match of every row
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        Results dataframe
+    team : str
+        Column containing the team
+    values : pd.DataFrame
+        Values after each team's match keyed by season, league match and
+        team and sorted by league match
+
+    Returns
+    -------
+    pd.DataFrame
+        Values in the same order as the dataframe, 0 for the teams without
+        previous matches
+    """
+    data = pd.DataFrame({
+        'season': dataframe['season'].values,
+        'league_match': dataframe['league_match'].values,
+        'team': dataframe[team].values,
+        'position': np.arange(len(dataframe))
+    })
+    data = data.sort_values('league_match', kind='stable')
+
+    data = pd.merge_asof(data, values, on='league_match',
+                        by=['season', 'team'], allow_exact_matches=False)
+    data = data.sort_values('position')
+
+    columns = [column for column in values.columns
+                if column not in ('season', 'league_match', 'team')]
+
+    for column in columns:
+        data[column] = data[column].fillna(0).values.astype(values[column].dtype)
+
+    return data
+
+def get_team_matches(results: pd.DataFrame,
+                    general: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Splits every result into one row per team with its venue and result
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        Results dataframe
+    general : pd.DataFrame, optional
+        General ranking, used to get the goals of each match
+
+    Returns
+    -------
+    pd.DataFrame
+        Season, league match, team, venue ('home' or 'away'), result
+        ('win', 'draw', 'loss' or None for invalid outcomes) and points of
+        every team. If the general ranking is given, also the goals scored
+        and conceded in the match.
+    """
+    matches = []
+
+    for team, rival in (('team_1', 'team_2'), ('team_2', 'team_1')):
+        outcome = results['outcome'].values
+        result = np.select([outcome == team, outcome == 'draw', outcome == rival],
+                            ['win', 'draw', 'loss'], default=None)
+        venue = np.where(results['home'].values == team, 'home', 'away')
+
+        matches.append(pd.DataFrame({
+            'season': results['season'].values,
+            'league_match': results['league_match'].values,
+            'team': results[team].values,
+            'venue': venue,
+            'result': result
+        }))
+
+    matches = pd.concat(matches, ignore_index=True)
+    matches['points'] = matches['result'].map({'win': 3, 'draw': 1}).fillna(0).astype(np.int64)
+
+    if general is not None:
+        matches = add_match_goals(matches, general)
+
+    return matches
+
+def add_match_goals(matches: pd.DataFrame, general: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the goals scored and conceded in each match as the difference of
+    the general ranking cumulative goals with the previous league match
+
+    Parameters
+    ----------
+    matches : pd.DataFrame
+        Matches of every team
+    general : pd.DataFrame
+        General ranking
+
+    Returns
+    -------
+    pd.DataFrame
+        Matches with the goals scored and conceded
+    """
+    keys = ['season', 'league_match', 'team']
+    goals = ['goals_scored', 'goals_conceded']
+    ranking = general[keys + goals].drop_duplicates(keys)
+    previous = ranking.assign(league_match=ranking['league_match'] + 1)
+
+    data = matches[keys].merge(ranking, how='left', on=keys)
+    data = data.merge(previous, how='left', on=keys, suffixes=('', '_previous'))
+
+    for column in goals:
+        # There are no previous goals before the first league match
+        previous_goals = data[f'{column}_previous'].where(
+                                    data['league_match'] > 1, 0)
+        matches[column] = (data[column] - previous_goals).values
+
+    return matches
+
+class SortColumns():
+    """
+    Moves a set of columns to the end of the dataframe in the given order
+
+    Parameters
+    ----------
+    columns : List[str]
+        Columns in the desired order
+
+    Attributes
+    ----------
+    _columns : List[str]
+        Columns in the desired order
+    """
+    def __init__(self, columns: List[str]) -> None:
+        self._columns = columns
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        columns = [column for column in dataframe.columns
+                    if column not in self._columns]
+
+        # A copy, not a slice, so the next preprocesses can add columns
+        return dataframe[columns + self._columns].copy()
+
+class MergeRankingFeatures():
+    """
+    Creates the ranking features of both teams at once by joining the
+    results with the ranking tables, instead of looking up the statistics
+    row by row.
+
+    Parameters
+    ----------
+    general : pd.DataFrame
+        General ranking
+    home : pd.DataFrame
+        Home ranking
+    away : pd.DataFrame
+        Away ranking
+    features : List[Tuple[str, str, str]]
+        Features to be created as (ranking table, ranking column, feature)
+
+    Attributes
+    ----------
+    _rankings : dict
+        Dictionary containing the ranking tables by name
+    _features : List[Tuple[str, str, str]]
+        Features to be created as (ranking table, ranking column, feature)
+    """
+    KEYS = ['season', 'league_match', 'team']
+
+    def __init__(self, general: pd.DataFrame, home: pd.DataFrame,
+                away: pd.DataFrame,
+                features: List[Tuple[str, str, str]] = RANKING_FEATURES):
+        self._rankings = {'general': general, 'home': home, 'away': away}
+        self._features = features
+
+    def _get_prior_ranking(self, table: str,
+                            statistics: List[str]) -> pd.DataFrame:
+        """
+        Gets the teams statistics before playing each league match
+
+        Parameters
+        ----------
+        table : str
+            Ranking table name
+        statistics : List[str]
+            Ranking columns to retrieve
+
+        Returns
+        -------
+        pd.DataFrame
+            Ranking statistics keyed by the league match they precede
+        """
+        ranking = self._rankings[table][self.KEYS + statistics]
+        # Keeps the first occurrence of duplicated keys, as the row-wise
+        # lookups do
+        ranking = ranking.drop_duplicates(self.KEYS)
+        # The statistics before playing a match are the ones from the
+        # previous league match
+        ranking = ranking.assign(league_match=ranking['league_match'] + 1)
+
+        return ranking
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        features = {}
+        tables = list(dict.fromkeys(table for table, _, _ in self._features))
+
+        # One join per ranking table and team
+        for table in tables:
+            statistics = list(dict.fromkeys(column for name, column, _
+                                            in self._features if name == table))
+            ranking = self._get_prior_ranking(table, statistics)
+
+            for team, suffix in (('team_1', 't1'), ('team_2', 't2')):
+                data = dataframe[['season', 'league_match', team]].merge(
+                            ranking, how='left',
+                            left_on=['season', 'league_match', team],
+                            right_on=self.KEYS)
+
+                missing = data['team'].isna().values
+
+                if missing.any():
+                    season, league_match, name = data.loc[missing,
+                        ['season', 'league_match', team]].values[0]
+                    logger.info(f'Preprocess: Error on {season} - '
+                                f'{league_match - 1}, {name}')
+                    raise KeyError(f'{missing.sum()} matches without '
+                                    f'{table} ranking statistics')
+
+                for name, column, feature in self._features:
+                    if name == table:
+                        features[f'{feature}_{suffix}'] = data[column].values
+
+        for _, _, feature in self._features:
+            for suffix in ('t1', 't2'):
+                column = f'{feature}_{suffix}'
+                dataframe[column] = features[column]
+
+        return dataframe
+
+def get_merge_feature_pipeline(general, home, away, features=RANKING_FEATURES):
+    """
+    Creates a feature pipeline equivalent to the one returned by
+    get_feature_pipeline, but computing the features with joins.
+    """
+    pipeline = FeaturePipeline([
+        MergeRankingFeatures(general, home, away, features)
     ])
-    # General, home and away goals conceded
-    goals_conceded_pipeline = FeaturePipeline([
-        ComputeGoalsConceded(
-                general,
-                ['team_1', 'team_2'],
-                ['general_goals_conceded_t1', 'general_goals_conceded_t2']),
-        ComputeGoalsConceded(
-                home,
-                ['team_1', 'team_2'],
-                ['home_goals_conceded_t1', 'home_goals_conceded_t2']),
-        ComputeGoalsConceded(
-                away,
-                ['team_1', 'team_2'],
-                ['away_goals_conceded_t1', 'away_goals_conceded_t2'])
+
+    return pipeline
+
+def get_tensor_feature_pipeline(general, home, away, features=RANKING_FEATURES):
+    """
+    Creates a feature pipeline equivalent to the one returned by
+    get_feature_pipeline, reading the statistics from ranking tensors.
+    """
+    tensors = get_ranking_tensors(general, home, away)
+    preprocesses = []
+
+    for table, tensor in tensors.items():
+        statistics = get_ranking_statistics(table, features)
+
+        if statistics:
+            preprocesses.append(ComputeTensorStatistics(tensor,
+                                                        ['team_1', 'team_2'],
+                                                        statistics))
+
+    pipeline = FeaturePipeline(preprocesses + [
+        SortColumns([f'{feature}_{team}' for _, _, feature in features
+                                        for team in ('t1', 't2')])
     ])
 
+    return pipeline
+
+def get_ranking_statistics(table: str, features: List[Tuple[str, str, str]]
+                            ) -> Dict[str, List[str]]:
+    """
+    Maps each column of a ranking table to the features of both teams
+    created from it
+    """
+    statistics = {}
+
+    for name, column, feature in features:
+        if name == table:
+            statistics.setdefault(column, []).extend([f'{feature}_t1',
+                                                    f'{feature}_t2'])
+
+    return statistics
+
+def get_feature_pipeline(general, home, away, results=None,
+                        features=RANKING_FEATURES, form_windows=None,
+                        rating=None):
+    # Retrieve all the statistics of a ranking table in a single lookup
+    # per team and match. The tables without required features are skipped.
+    preprocesses = []
+
+    for table, ranking in (('general', general), ('home', home),
+                            ('away', away)):
+        statistics = get_ranking_statistics(table, features)
+
+        if statistics:
+            preprocesses.append(ComputeRankingStatistics(RankingIndex(ranking),
+                                                        ['team_1', 'team_2'],
+                                                        statistics))
+
+    preprocesses.append(
+        SortColumns([f'{feature}_{team}' for _, _, feature in features
+                                        for team in ('t1', 't2')])
+    )
+
+    # Streaks are computed from the results history when it is provided
+    if results is not None:
+        preprocesses.append(ComputeStreaks(results))
+
+    # Form over the last matches, only for the given windows. The goals are
+    # taken from the general ranking when it has them.
+    if results is not None and form_windows:
+        form_preprocesses = [ComputeFormPoints]
+
+        if {'goals_scored', 'goals_conceded'} <= set(general.columns):
+            matches = get_team_matches(results, general)
+            form_preprocesses += [ComputeFormGoalsScored, ComputeFormGoalsConceded]
+        else:
+            matches = get_team_matches(results)
+
+        preprocesses += [preprocess(matches, windows=form_windows)
+                        for preprocess in form_preprocesses]
+
+    # Elo ratings before each match, see get_required_rating
+    if rating is not None:
+        preprocesses.append(ComputeEloRating(rating))
+
     # Feature preprocessing pipeline
-    pipeline = FeaturePipeline([
-        ComputeLeagueRankPosition(general, ['team_1', 'team_2'],
-                                ['rank_t1', 'rank_t2']),
-        wins_pipeline,
-        draws_pipeline,
-        loss_pipeline,
-        goals_scored_pipeline,
-        goals_conceded_pipeline
-    ])
+    pipeline = FeaturePipeline(preprocesses)
 
-    return pipeline
\ No newline at end of file
+    return pipeline
@@ -0,0 +1,285 @@
+import os
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config.logger_config import logger
+
+class FeatureTable():
+    """
+    Feature table persisted on disk. Its watermark, the (season,
+    league_match) of the last league match whose features were computed, is
+    read from the persisted features, so both are always replaced at once.
+
+    Parameters
+    ----------
+    path : str or Path
+        Parquet file containing the features
+
+    Attributes
+    ----------
+    _path : Path
+        Parquet file containing the features
+    """
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._path = Path(path)
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def load(self) -> pd.DataFrame:
+        """
+        Loads the persisted features
+
+        Returns
+        -------
+        pd.DataFrame
+            Features computed so far
+        """
+        return pd.read_parquet(self._path)
+
+    def get_watermark(self) -> Optional[Tuple[int, int]]:
+        """
+        Gets the last season and league match whose features were computed
+
+        Returns
+        -------
+        Tuple[int, int] or None
+            (season, league_match) watermark or None if there is not any
+            persisted feature
+        """
+        if not self.exists():
+            return None
+
+        # Only the key columns are read
+        keys = pq.read_table(self._path, columns=['season', 'league_match'])
+
+        if keys.num_rows == 0:
+            return None
+
+        keys = keys.to_pandas()
+        season = keys['season'].max()
+        league_match = keys.loc[keys['season'] == season, 'league_match'].max()
+
+        return int(season), int(league_match)
+
+    def get_teams(self) -> Optional[List[str]]:
+        """
+        Gets the teams of the persisted features, the categories of their
+        team columns, so the new data can get the same categories without
+        reading the teams of the whole history
+
+        Returns
+        -------
+        List[str] or None
+            Sorted teams or None if there is not any persisted feature table
+        """
+        if not self.exists():
+            return None
+
+        # Only the team columns are read
+        data = pq.read_table(self._path, columns=['team_1', 'team_2']).to_pandas()
+        teams = set()
+
+        for column in ('team_1', 'team_2'):
+            if isinstance(data[column].dtype, pd.CategoricalDtype):
+                teams |= set(data[column].cat.categories)
+            else:
+                teams |= set(data[column])
+
+        return sorted(teams)
+
+    def get_new_results(self, results: pd.DataFrame) -> pd.DataFrame:
+        """
+        Filters the results played after the watermark
+
+        Parameters
+        ----------
+        results : pd.DataFrame
+            Results dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            Results whose features have not been computed yet
+        """
+        watermark = self.get_watermark()
+
+        if watermark is None:
+            return results
+
+        season, league_match = watermark
+        is_new = ((results['season'] > season)
+                    | ((results['season'] == season)
+                        & (results['league_match'] > league_match)))
+        results = results.loc[is_new.values].reset_index(drop=True)
+
+        return results
+
+    def save(self, features: pd.DataFrame) -> None:
+        """
+        Overwrites the feature table, and so its watermark
+
+        Parameters
+        ----------
+        features : pd.DataFrame
+            Features to be persisted
+        """
+        tmp_path = self._get_tmp_path(self._path)
+
+        try:
+            features.to_parquet(tmp_path)
+            # The table is only replaced when it was written in full
+            os.replace(tmp_path, self._path)
+        finally:
+            remove_file(tmp_path)
+
+    def save_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Overwrites the feature table writing the chunks as they arrive, so
+        the whole table is never held in memory. Without any chunk the
+        table is removed, there is not any feature.
+
+        Parameters
+        ----------
+        chunks : Iterable[pd.DataFrame]
+            Features ordered by season and league match
+
+        Returns
+        -------
+        int
+            Number of rows written
+        """
+        tmp_path = self._get_tmp_path(self._path)
+
+        try:
+            n_rows = write_parquet_chunks(chunks, tmp_path)
+
+            if tmp_path.exists():
+                os.replace(tmp_path, self._path)
+            else:
+                remove_file(self._path)
+        finally:
+            remove_file(tmp_path)
+
+        logger.info(f'Feature table: {n_rows} rows written in chunks')
+
+        return n_rows
+
+    def append(self, features: pd.DataFrame) -> pd.DataFrame:
+        """
+        Appends new features to the persisted ones and moves the watermark
+
+        Parameters
+        ----------
+        features : pd.DataFrame
+            Features of the new results
+
+        Returns
+        -------
+        pd.DataFrame
+            Whole feature table
+        """
+        if not self.exists():
+            self.save(features)
+
+            return features
+
+        data = self.load()
+
+        if len(features) > 0:
+            data = pd.concat(union_categories([data, features]),
+                            ignore_index=True)
+            self.save(data)
+
+        logger.info(f'Feature table: {len(features)} new rows, '
+                    f'{len(data)} in total')
+
+        return data
+
+    @staticmethod
+    def _get_tmp_path(path: Path) -> Path:
+        # Same directory, so os.replace does not move it across filesystems
+        return path.with_name(f'.{path.name}.tmp')
+
+def union_categories(dataframes: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """
+    Sets the sorted union of the categories to the categorical columns of
+    the dataframes, so they stay categorical when they are concatenated,
+    e.g. the features persisted before a new team appeared and the new ones
+
+    Parameters
+    ----------
+    dataframes : List[pd.DataFrame]
+        Dataframes with the same columns
+
+    Returns
+    -------
+    List[pd.DataFrame]
+        Dataframes with the same categories
+    """
+    for column in dataframes[0].columns:
+        dtypes = [dataframe[column].dtype for dataframe in dataframes]
+
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            continue
+
+        categories = sorted(set().union(*[dtype.categories for dtype in dtypes]))
+        dataframes = [dataframe.assign(**{
+                        column: dataframe[column].cat.set_categories(categories)})
+                        for dataframe in dataframes]
+
+    return dataframes
+
+def remove_file(path: Path) -> None:
+    """
+    Removes a file if it exists
+    """
+    if path.exists():
+        path.unlink()
+
+def write_parquet_chunks(chunks: Iterable[pd.DataFrame],
+                        path: Union[str, Path]) -> int:
+    """
+    Writes a stream of dataframes with the same columns to a parquet file,
+    one row group per chunk
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Dataframes to be written
+    path : str or Path
+        Parquet file
+
+    Returns
+    -------
+    int
+        Number of rows written
+    """
+    writer, n_rows = None, 0
+
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                # Same schema as the first chunk, e.g. the categories of
+                # every chunk are encoded with the same index type
+                table = pa.Table.from_pandas(chunk, schema=writer.schema,
+                                            preserve_index=False)
+
+            writer.write_table(table)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_rows
@@ -6,17 +6,23 @@ from sklearn.compose import ColumnTransformer, make_column_selector
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from datetime import datetime
 from src.config.logger_config import logger
-from src.preprocessing.config import FEATURES_TO_DROP
+from src.preprocessing.config import FEATURES_TO_DROP, RATIO_FEATURES
+from src.preprocessing.dependencies import get_unrequired_features
 
 import numpy as np
 import pandas as pd
 
-from src.config.config import VARIABLES
+from src.config.config import FEATURES_DTYPE, VARIABLES
 
-def feature_eng_pipeline() -> Pipeline:
+def feature_eng_pipeline(dtype : str = FEATURES_DTYPE) -> Pipeline:
     """
     Creates the pipeline to transform the data
 
+    Parameters
+    ----------
+    dtype : str
+        Floating point type of the output features
+
     Returns
     -------
     pipeline : Pipeline
@@ -38,18 +44,12 @@ def feature_eng_pipeline() -> Pipeline:
         ('num', num_pipeline, make_column_selector(dtype_include=np.number))
     ])
 
-    feature_pipeline = Pipeline([
-        ('win_ratio', WinRatio()),
-        ('draw_ratio', DrawRatio()),
-        ('loss_ratio', LossRatio()),
-    ])
-
     # Final pipeline
     pipeline = Pipeline([
-        ('feature_pipeline', feature_pipeline),
+        ('ratios', RatioFeatures()),
         ('feature_selector', FeatureSelector(FEATURES_TO_DROP)),
         ('prep', prep_pipeline),
-        ('feature_store', ToDataset())
+        ('feature_store', ToDataset(dtype=dtype))
     ])
 
     return pipeline
@@ -90,6 +90,177 @@ def fit_and_process_data(
 
     return X_train, X_test, y_train, y_test
 
+class CompiledPipeline():
+    """
+    NumPy version of a fitted feature engineering pipeline intended for low
+    latency inference. It computes the ratios, selects the columns and
+    standardizes them over arrays with a fixed column order, giving the
+    same values as the original pipeline without building dataframes.
+
+    Arguments
+    ---------
+    input_columns : List of str
+        Columns expected in the input, in order.
+    ratio_positions : np.ndarray
+        Input positions of the counts used to compute the ratios.
+    divide : bool
+        Whether the ratios are computed dividing by the league match, as the
+        single ratio preprocesses do, or multiplying by its reciprocal.
+    selected_positions : np.ndarray
+        Positions of the output columns within the inputs followed by the
+        ratios.
+    mean : np.ndarray, optional
+        Mean subtracted to every output column.
+    scale : np.ndarray, optional
+        Scale dividing every output column.
+    columns : List of str
+        Output columns.
+    dtype : str
+        Floating point type of the output. The data is transformed in
+        float64, as the original pipeline, and then cast.
+
+    Attributes
+    ----------
+    input_columns : List of str
+        Columns expected in the input, in order.
+    columns : List of str
+        Output columns.
+    dtype : np.dtype
+        Floating point type of the output.
+    """
+    def __init__(self, input_columns : List[str], ratio_positions : np.ndarray,
+                divide : bool, selected_positions : np.ndarray,
+                mean : Optional[np.ndarray], scale : Optional[np.ndarray],
+                columns : List[str], dtype : str = 'float64') -> None:
+        self.input_columns = input_columns
+        self.columns = columns
+        self.dtype = np.dtype(dtype)
+        self._league_match_position = input_columns.index('league_match')
+        self._ratio_positions = ratio_positions
+        self._divide = divide
+        self._selected_positions = selected_positions
+        self._mean = mean
+        self._scale = scale
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Transform the data
+
+        Parameters
+        ----------
+        X : pd.DataFrame or array like of shape (n, input columns)
+            Data to transform. Arrays must follow the input columns order.
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (n, columns)
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.input_columns]
+
+        X = np.asarray(X, dtype=np.float64)
+
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+
+        counts = X[:, self._ratio_positions]
+        league_match = X[:, [self._league_match_position]]
+
+        if self._divide:
+            ratios = counts / league_match
+        else:
+            ratios = counts * (1 / league_match)
+
+        X = np.concatenate([X, ratios], axis=1)[:, self._selected_positions]
+
+        # Same operations as StandardScaler.transform
+        if self._mean is not None:
+            X -= self._mean
+        if self._scale is not None:
+            X /= self._scale
+
+        # Same cast as ToDataset, so the served features are the training ones
+        return X.astype(self.dtype, copy=False)
+
+def compile_pipeline(pipeline : Pipeline,
+                    dtype : Optional[str] = None) -> CompiledPipeline:
+    """
+    Exports a fitted feature engineering pipeline as a CompiledPipeline
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Fitted pipeline created by feature_eng_pipeline
+    dtype : str, optional
+        Floating point type of the output. By default, the type of the
+        features created by the pipeline.
+
+    Returns
+    -------
+    CompiledPipeline
+        Pipeline equivalent to the original one
+    """
+    ratios_step = pipeline.steps[0][1]
+
+    if isinstance(ratios_step, RatioFeatures):
+        ratios, divide = ratios_step.ratios, False
+    else:
+        # Pipeline of single ratio preprocesses
+        ratios, divide = RATIO_FEATURES, True
+
+    selector = pipeline.named_steps['feature_selector']
+    prep = pipeline.named_steps['prep']
+
+    selected_columns, mean, scale = [], None, None
+
+    for name, transformer, columns in prep.transformers_:
+        if transformer == 'drop' or len(columns) == 0:
+            continue
+
+        if name != 'num':
+            raise ValueError(f"The '{name}' transformer can not be compiled")
+
+        selected_columns = list(columns)
+        scaler = transformer.named_steps['scaler']
+        mean = scaler.mean_ if scaler.with_mean else None
+        scale = scaler.scale_ if scaler.with_std else None
+
+    ratio_columns = [ratio for ratio, _ in ratios]
+    count_columns = [count for _, count in ratios]
+
+    # Raw columns needed to compute the output
+    input_columns = list(dict.fromkeys(
+        ['league_match'] + count_columns
+        + [column for column in selected_columns if column not in ratio_columns]
+    ))
+    # The ratios are placed after the inputs
+    positions = {column: i for i, column in enumerate(input_columns
+                                                        + ratio_columns)}
+
+    dropped = set(selector.features) & set(selected_columns)
+
+    if dropped:
+        raise ValueError(f'The columns {dropped} are selected and dropped')
+
+    features = pipeline.named_steps['feature_store'].transform(
+                    np.zeros((0, len(selected_columns))))
+    columns = features.columns.tolist()
+    columns.remove('created_on')
+
+    if dtype is None:
+        dtype = features[columns].dtypes.iloc[0] if columns else 'float64'
+
+    compiled = CompiledPipeline(
+        input_columns,
+        np.array([input_columns.index(count) for count in count_columns]),
+        divide,
+        np.array([positions[column] for column in selected_columns]),
+        mean, scale, columns, dtype
+    )
+
+    return compiled
+
 class FeatureSelector(BaseEstimator, TransformerMixin):
     """
     Remove a list of features from the data
@@ -115,7 +286,18 @@ class FeatureSelector(BaseEstimator, TransformerMixin):
         X : pd.DataFrame,
         y : Optional[np.ndarray] = None
         ) -> pd.DataFrame:
-        return X.drop(self.features, axis=1)
+        # Only the features left out by the projection may be missing, any
+        # other one, e.g. a misspelled feature, raises
+        missing = set(self.features) - set(X.columns)
+        unexpected = missing - set(get_unrequired_features())
+
+        if unexpected:
+            raise KeyError(f'Features not found: {sorted(unexpected)}')
+
+        features = [feature for feature in self.features
+                    if feature not in missing]
+
+        return X.drop(features, axis=1, errors='raise')
 
 class ToDataset(BaseEstimator, TransformerMixin):
     """
@@ -125,14 +307,20 @@ class ToDataset(BaseEstimator, TransformerMixin):
     ---------
     columns : List of str
         List containing the desired dataset columns.
+    dtype : str
+        Floating point type of the dataset columns.
 
     Attributes
     ---------
     variables : List of str
         List containing the desired dataset columns.
+    dtype : str
+        Floating point type of the dataset columns.
     """
-    def __init__(self, columns : List[str] = VARIABLES):
+    def __init__(self, columns : List[str] = VARIABLES,
+                dtype : str = 'float64'):
         self.variables = columns
+        self.dtype = dtype
 
     def fit(self, X, y=None):
         return self
@@ -140,14 +328,48 @@ class ToDataset(BaseEstimator, TransformerMixin):
     def transform(self, X, y=None):
         # Convert to a dataframe
         variables = [var for var in VARIABLES if var != 'outcome']
+        # Pipelines pickled before the dtype was added produce float64
+        dtype = getattr(self, 'dtype', 'float64')
 
-        X = pd.DataFrame(X, columns=variables)
+        X = pd.DataFrame(np.asarray(X, dtype=dtype), columns=variables)
         # Adds a timestamp to define the datetime where the features were created
         now = datetime.now()
         X['created_on'] = [datetime(now.year, now.month, now.day)] * len(X)
         
         return X
 
+class RatioFeatures(BaseEstimator, TransformerMixin):
+    """
+    Computes all the ratio features at once dividing the counts by the
+    league match. It does not modify the input data.
+
+    Arguments
+    ---------
+    ratios : List of tuples
+        Ratio features to compute as (ratio feature, count feature)
+
+    Attributes
+    ----------
+    ratios : List of tuples
+        Ratio features to compute as (ratio feature, count feature)
+    """
+    def __init__(self, ratios : List[Tuple[str, str]] = RATIO_FEATURES) -> None:
+        self.ratios = ratios
+
+    def fit(self, X : pd.DataFrame, y : Optional[np.ndarray] = None) -> RatioFeatures:
+        return self
+
+    def transform(self, X : pd.DataFrame, y : Optional[np.ndarray] = None):
+        counts = X[[count for _, count in self.ratios]].to_numpy(dtype=np.float64)
+        # Every count is divided by the same league match
+        reciprocal = 1 / X['league_match'].to_numpy(dtype=np.float64)
+
+        ratios = pd.DataFrame(counts * reciprocal[:, np.newaxis],
+                            columns=[ratio for ratio, _ in self.ratios],
+                            index=X.index)
+
+        return pd.concat([X, ratios], axis=1)
+
 class WinRatio(BaseEstimator, TransformerMixin):
     def __init__(self) -> None:
         pass
@@ -0,0 +1,189 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ranking statistics stored in the tensor
+RANKING_STATS = ['rank_pos', 'matches', 'wins', 'draws', 'losses',
+                'goals_scored', 'goals_conceded', 'goals_difference']
+
+# Value used for the (season, league_match, team) without ranking
+MISSING = np.iinfo(np.int16).min
+
+class TeamDictionary():
+    """
+    Encodes the teams' names as consecutive integer identifiers
+
+    Parameters
+    ----------
+    teams : Iterable[str]
+        Teams' names
+
+    Attributes
+    ----------
+    teams : pd.Index
+        Sorted teams' names, the position is the team identifier
+    """
+    def __init__(self, teams: Iterable[str]) -> None:
+        self.teams = pd.Index(sorted(set(teams)))
+
+    def encode(self, teams: Iterable[str]) -> np.ndarray:
+        """
+        Gets the identifiers of the given teams, -1 for unknown teams
+        """
+        return self.teams.get_indexer(teams)
+
+    def decode(self, team_ids: np.ndarray) -> np.ndarray:
+        return self.teams.values[team_ids]
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+class RankingTensor():
+    """
+    Dense representation of a ranking table as an int16 array of shape
+    [season, league_match, team_id, stat]
+
+    Parameters
+    ----------
+    ranking_df : pd.DataFrame
+        Ranking table
+    team_dictionary : TeamDictionary
+        Dictionary used to encode the teams
+    seasons : Tuple[int, int]
+        First and last seasons
+    n_league_matches : int
+        Number of league matches per season
+
+    Attributes
+    ----------
+    data : np.ndarray
+        Array of shape [season, league_match, team_id, stat]. The league
+        match axis is indexed by the league match number itself.
+    team_dictionary : TeamDictionary
+        Dictionary used to encode the teams
+    first_season : int
+        Season stored in the first position of the array
+    stats : List[str]
+        Statistics stored in the last axis
+    dtypes : Dict[str, np.dtype]
+        Original dtype of every statistic
+    """
+    def __init__(self, ranking_df: pd.DataFrame,
+                team_dictionary: TeamDictionary,
+                seasons: Tuple[int, int], n_league_matches: int) -> None:
+        self.team_dictionary = team_dictionary
+        self.first_season = seasons[0]
+        # Only the retrieved statistics are stored
+        self.stats = [stat for stat in RANKING_STATS
+                        if stat in ranking_df.columns]
+        self.dtypes = {stat: ranking_df[stat].dtype for stat in self.stats}
+
+        shape = (seasons[1] - seasons[0] + 1, n_league_matches + 1,
+                len(team_dictionary), len(self.stats))
+        self.data = np.full(shape, MISSING, dtype=np.int16)
+
+        season_ids = ranking_df['season'].values - self.first_season
+        league_matches = ranking_df['league_match'].values
+        team_ids = team_dictionary.encode(ranking_df['team'])
+        values = ranking_df[self.stats].values.astype(np.int16)
+
+        # Keeps the first occurrence of duplicated keys, as the row-wise
+        # lookups do. The assignment order of repeated indices is not
+        # defined, so the duplicates are removed beforehand.
+        keys = np.ravel_multi_index((season_ids, league_matches, team_ids),
+                                    shape[:3])
+        _, first = np.unique(keys, return_index=True)
+
+        self.data[season_ids[first], league_matches[first],
+                team_ids[first]] = values[first]
+
+    def get_stat_positions(self, stats: List[str]) -> List[int]:
+        return [self.stats.index(stat) for stat in stats]
+
+    def get(self, seasons: np.ndarray, league_matches: np.ndarray,
+            teams: Iterable[str], stats: List[str]) -> np.ndarray:
+        """
+        Retrieves the statistics for a batch of keys with fancy indexing
+
+        Parameters
+        ----------
+        seasons : np.ndarray
+            Seasons
+        league_matches : np.ndarray
+            League matches
+        teams : Iterable[str]
+            Teams' names
+        stats : List[str]
+            Statistics to retrieve
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (keys, stats)
+
+        Raises
+        ------
+        KeyError
+            If any key does not have ranking statistics
+        """
+        season_ids = np.asarray(seasons) - self.first_season
+        league_matches = np.asarray(league_matches)
+        team_ids = self.team_dictionary.encode(teams)
+
+        valid = ((season_ids >= 0) & (season_ids < self.data.shape[0])
+                & (league_matches >= 0) & (league_matches < self.data.shape[1])
+                & (team_ids >= 0))
+        values = np.full((len(team_ids), len(stats)), MISSING, dtype=np.int16)
+        values[valid] = self.data[season_ids[valid], league_matches[valid],
+                                team_ids[valid]][:, self.get_stat_positions(stats)]
+
+        missing = (values == MISSING).any(axis=1)
+
+        if missing.any():
+            raise KeyError(f'{missing.sum()} keys without ranking statistics, '
+                        f'e.g. {season_ids[missing][0] + self.first_season} - '
+                        f'{league_matches[missing][0]}, '
+                        f'{np.asarray(teams)[missing][0]}')
+
+        return values
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+def get_ranking_tensors(general: pd.DataFrame, home: pd.DataFrame,
+                        away: pd.DataFrame) -> Dict[str, RankingTensor]:
+    """
+    Builds the tensors of the three ranking tables sharing the same team
+    dictionary and shape
+
+    Parameters
+    ----------
+    general : pd.DataFrame
+        General ranking
+    home : pd.DataFrame
+        Home ranking
+    away : pd.DataFrame
+        Away ranking
+
+    Returns
+    -------
+    Dict[str, RankingTensor]
+        Tensors by ranking table name
+    """
+    rankings = {'general': general, 'home': home, 'away': away}
+
+    team_dictionary = TeamDictionary(pd.concat([ranking['team'] for ranking
+                                                in rankings.values()]))
+    seasons = (min(ranking['season'].min() for ranking in rankings.values()),
+                max(ranking['season'].max() for ranking in rankings.values()))
+    n_league_matches = max(ranking['league_match'].max()
+                            for ranking in rankings.values())
+
+    tensors = {
+        name: RankingTensor(ranking, team_dictionary, seasons, n_league_matches)
+        for name, ranking in rankings.items()
+    }
+
+    return tensors
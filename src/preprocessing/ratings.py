@@ -0,0 +1,312 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pickle
+
+from src.config.config import RATINGS_PATH, VARIABLES
+from src.config.logger_config import logger
+from src.preprocessing.config import RATING_FEATURES, RESULTS_COLS
+from src.preprocessing.dependencies import get_required_features
+
+# Columns identifying a match
+MATCH_KEYS = ['season', 'league_match', 'team_1', 'team_2']
+
+class EloRating():
+    """
+    Elo rating of the teams, updated in chronological order with the
+    results of every league match.
+
+    The matches of a league match are independent, every team plays once,
+    so each league match is applied at once over arrays of team ids. The
+    ratings before each league match are kept as snapshots, so they can be
+    read by key and only the league matches after the last snapshot must
+    be applied when new results arrive. The results of the last league
+    match which arrive late, or whose outcome changes, e.g. a match not
+    played yet, are applied again with the whole league match, starting
+    from the ratings before it.
+
+    Parameters
+    ----------
+    k : float
+        Maximum rating change per match
+    home_advantage : float
+        Rating points added to the home team to compute the expected score
+    initial_rating : float
+        Rating of the teams without matches
+
+    Attributes
+    ----------
+    k : float
+        Maximum rating change per match
+    home_advantage : float
+        Rating points added to the home team to compute the expected score
+    initial_rating : float
+        Rating of the teams without matches
+    watermark : Tuple[int, int], optional
+        Last (season, league_match) applied
+    _team_ids : Dict[str, int]
+        Teams' identifiers
+    _ratings : np.ndarray
+        Current rating of every team by identifier
+    _snapshots : List[pd.DataFrame]
+        Ratings of the teams before each league match they played
+    _last_round : pd.DataFrame, optional
+        Results of the last league match applied
+    _previous_ratings : np.ndarray, optional
+        Ratings before the last league match applied
+    """
+    def __init__(self, k: float = 20, home_advantage: float = 100,
+                initial_rating: float = 1500) -> None:
+        self.k = k
+        self.home_advantage = home_advantage
+        self.initial_rating = initial_rating
+        self.watermark = None
+
+        self._team_ids = {}
+        self._ratings = np.array([], dtype=np.float64)
+        self._snapshots = []
+        self._last_round = None
+        self._previous_ratings = None
+
+    def _get_team_ids(self, teams: Iterable[str]) -> np.ndarray:
+        # New teams start with the initial rating
+        for team in teams:
+            if team not in self._team_ids:
+                self._team_ids[team] = len(self._team_ids)
+
+        n_new = len(self._team_ids) - len(self._ratings)
+
+        if n_new > 0:
+            self._ratings = np.concatenate([self._ratings,
+                                            np.full(n_new, self.initial_rating)])
+
+        return np.array([self._team_ids[team] for team in teams], dtype=np.int64)
+
+    def _is_after_watermark(self, data: pd.DataFrame) -> np.ndarray:
+        if self.watermark is None:
+            return np.ones(len(data), dtype=bool)
+
+        season, league_match = self.watermark
+        is_new = ((data['season'] > season)
+                    | ((data['season'] == season)
+                        & (data['league_match'] > league_match)))
+
+        return is_new.values
+
+    def _get_results_to_apply(self, results: pd.DataFrame) -> pd.DataFrame:
+        new_results = results.loc[self._is_after_watermark(results)]
+
+        if self.watermark is None:
+            return new_results
+
+        # The last league match is applied again when it got new results
+        season, league_match = self.watermark
+        last_round = results.loc[(results['season'] == season).values
+                                & (results['league_match'] == league_match).values]
+        last_round = pd.concat([self._last_round, last_round[RESULTS_COLS]])
+        last_round = last_round.drop_duplicates(MATCH_KEYS, keep='last')
+
+        if not self._is_same_round(last_round):
+            self._rollback()
+            new_results = pd.concat([last_round, new_results[RESULTS_COLS]])
+
+        return new_results
+
+    def _is_same_round(self, last_round: pd.DataFrame) -> bool:
+        last_round, applied = (data.sort_values(MATCH_KEYS).reset_index(drop=True)
+                                .astype(object)
+                                for data in (last_round, self._last_round))
+
+        return last_round.equals(applied)
+
+    def _rollback(self) -> None:
+        # Undoes the last league match, the teams added by it keep their ids
+        season, league_match = self.watermark
+        n_previous = len(self._previous_ratings)
+
+        self._ratings[:n_previous] = self._previous_ratings
+        self._ratings[n_previous:] = self.initial_rating
+
+        snapshots = self.snapshots
+        self._snapshots = [snapshots.loc[(snapshots['season'] != season).values
+                                        | (snapshots['league_match']
+                                            != league_match).values]]
+
+    def update(self, results: pd.DataFrame) -> EloRating:
+        """
+        Applies the results played after the last snapshot, and the last
+        league match again when it got new results
+
+        Parameters
+        ----------
+        results : pd.DataFrame
+            Results dataframe, it may contain already applied results
+
+        Returns
+        -------
+        EloRating
+            The rating itself
+        """
+        results = self._get_results_to_apply(results)
+        results = results.sort_values(['season', 'league_match'], kind='stable')
+
+        if len(results) == 0:
+            return self
+
+        seasons = results['season'].values
+        league_matches = results['league_match'].values
+        team_1 = self._get_team_ids(results['team_1'].values)
+        team_2 = self._get_team_ids(results['team_2'].values)
+
+        outcome = results['outcome'].values
+        score = np.select([outcome == 'team_1', outcome == 'draw',
+                            outcome == 'team_2'], [1.0, 0.5, 0.0],
+                            default=np.nan)
+        # Home advantage from team_1's point of view
+        advantage = np.where(results['home'].values == 'team_1',
+                            self.home_advantage, -self.home_advantage)
+
+        # Boundaries of each league match
+        new_round = np.flatnonzero((seasons[1:] != seasons[:-1])
+                                    | (league_matches[1:] != league_matches[:-1]))
+        starts = np.concatenate([[0], new_round + 1])
+        ends = np.concatenate([new_round + 1, [len(results)]])
+
+        snapshots = np.empty((len(results), 2))
+
+        for start, end in zip(starts, ends):
+            # Kept to apply the last league match again
+            if end == len(results):
+                self._previous_ratings = self._ratings.copy()
+
+            ids_1, ids_2 = team_1[start:end], team_2[start:end]
+            ratings_1, ratings_2 = self._ratings[ids_1], self._ratings[ids_2]
+
+            snapshots[start:end, 0] = ratings_1
+            snapshots[start:end, 1] = ratings_2
+
+            expected = 1 / (1 + 10 ** ((ratings_2 - ratings_1
+                                        - advantage[start:end]) / 400))
+            # Invalid outcomes do not change the ratings
+            delta = np.nan_to_num(self.k * (score[start:end] - expected))
+
+            np.add.at(self._ratings, ids_1, delta)
+            np.add.at(self._ratings, ids_2, -delta)
+
+        self._snapshots.append(pd.DataFrame({
+            'season': np.concatenate([seasons, seasons]),
+            'league_match': np.concatenate([league_matches, league_matches]),
+            'team': np.concatenate([results['team_1'].values,
+                                    results['team_2'].values]),
+            'rating': np.concatenate([snapshots[:, 0], snapshots[:, 1]])
+        }))
+        self.watermark = (int(seasons[-1]), int(league_matches[-1]))
+        self._last_round = results.iloc[starts[-1]:][RESULTS_COLS]
+
+        logger.info(f'Elo rating: {len(results)} results applied up to '
+                    f'{self.watermark}')
+
+        return self
+
+    @property
+    def snapshots(self) -> pd.DataFrame:
+        """
+        Ratings of the teams before each league match they played
+        """
+        if len(self._snapshots) > 1:
+            self._snapshots = [pd.concat(self._snapshots, ignore_index=True)]
+
+        if not self._snapshots:
+            return pd.DataFrame(columns=['season', 'league_match', 'team',
+                                        'rating'])
+
+        return self._snapshots[0]
+
+    def get_current_ratings(self, teams: Iterable[str]) -> np.ndarray:
+        """
+        Gets the current ratings, the initial rating for unknown teams
+        """
+        return np.array([self._ratings[self._team_ids[team]]
+                        if team in self._team_ids else self.initial_rating
+                        for team in teams])
+
+    def get_ratings(self, seasons: Iterable[int], league_matches: Iterable[int],
+                    teams: Iterable[str]) -> np.ndarray:
+        """
+        Gets the ratings of the teams before the given league matches. The
+        league matches after the watermark get the current ratings, the
+        previous ones without snapshot get NaN, because the current ratings
+        include later results.
+
+        Parameters
+        ----------
+        seasons : Iterable[int]
+            Seasons
+        league_matches : Iterable[int]
+            League matches
+        teams : Iterable[str]
+            Teams' names
+
+        Returns
+        -------
+        np.ndarray
+            Ratings
+        """
+        keys = pd.DataFrame({'season': seasons, 'league_match': league_matches,
+                            'team': teams})
+        snapshots = self.snapshots.drop_duplicates(['season', 'league_match',
+                                                    'team'])
+        data = keys.merge(snapshots, how='left',
+                        on=['season', 'league_match', 'team'])
+
+        # Only the league matches not applied yet take the current ratings
+        missing = (data['rating'].isna().values
+                    & self._is_after_watermark(keys))
+
+        if missing.any():
+            data.loc[missing, 'rating'] = self.get_current_ratings(
+                                                data.loc[missing, 'team'])
+
+        return data['rating'].values
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> EloRating:
+        with open(path, 'rb') as file:
+            rating = pickle.load(file)
+
+        return rating
+
+def get_required_rating(variables: List[str] = VARIABLES,
+                        path: Union[str, Path] = RATINGS_PATH
+                        ) -> Optional[EloRating]:
+    """
+    Loads the Elo rating persisted by the data ingestion pipeline when the
+    final variables include the ratings
+
+    Parameters
+    ----------
+    variables : List[str]
+        Final variables used by the models
+    path : str or Path
+        Elo rating file path
+
+    Returns
+    -------
+    EloRating, optional
+        Elo rating, None if no final variable needs it
+    """
+    if not set(RATING_FEATURES) & set(get_required_features(variables)):
+        return None
+
+    if not Path(path).exists():
+        raise FileNotFoundError(f'{path} does not exist, the data ingestion '
+                                f'pipeline computes the Elo ratings')
+
+    return EloRating.load(path)
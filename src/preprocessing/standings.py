@@ -0,0 +1,169 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.config import RANKING_COLS, RESULTS_COLS
+
+# Results columns including the goals of both teams
+RESULTS_WITH_SCORES_COLS = RESULTS_COLS + ['goals_t1', 'goals_t2']
+
+# Statistics accumulated along the season
+STANDINGS_STATS = ['matches', 'wins', 'draws', 'losses', 'goals_scored',
+                    'goals_conceded']
+
+def get_match_statistics(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Splits every result into one row per team with the statistics it adds
+    to the standings. team_1 is the home team and team_2 the away team.
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        Results with the goals of both teams
+
+    Returns
+    -------
+    pd.DataFrame
+        Season, league match, team, venue ('home' or 'away') and statistics
+        of every team in every played match
+    """
+    # Matches without score were not played
+    results = results.dropna(subset=['goals_t1', 'goals_t2'])
+    matches = []
+
+    for team, venue, scored, conceded in (
+            ('team_1', 'home', 'goals_t1', 'goals_t2'),
+            ('team_2', 'away', 'goals_t2', 'goals_t1')):
+        goals_scored = results[scored].values
+        goals_conceded = results[conceded].values
+
+        matches.append(pd.DataFrame({
+            'season': results['season'].values,
+            'league_match': results['league_match'].values,
+            'team': results[team].values,
+            'venue': venue,
+            'matches': 1,
+            'wins': (goals_scored > goals_conceded).astype(np.int64),
+            'draws': (goals_scored == goals_conceded).astype(np.int64),
+            'losses': (goals_scored < goals_conceded).astype(np.int64),
+            'goals_scored': goals_scored.astype(np.int64),
+            'goals_conceded': goals_conceded.astype(np.int64)
+        }))
+
+    return pd.concat(matches, ignore_index=True)
+
+def compute_standings_table(matches: pd.DataFrame,
+                            grid: pd.MultiIndex) -> pd.DataFrame:
+    """
+    Accumulates the matches statistics along each season and ranks the teams
+    after every league match
+
+    Parameters
+    ----------
+    matches : pd.DataFrame
+        Statistics of every team in every match
+    grid : pd.MultiIndex
+        (season, team, league_match) of every row of the standings, so the
+        teams which did not play still appear
+
+    Returns
+    -------
+    pd.DataFrame
+        Standings with the ranking tables columns
+    """
+    stats = matches.groupby(['season', 'team', 'league_match'])[STANDINGS_STATS].sum()
+    stats = stats.reindex(grid, fill_value=0)
+    # The index is sorted by season, team and league match
+    table = stats.groupby(level=['season', 'team']).cumsum().reset_index()
+
+    table['goals_difference'] = table['goals_scored'] - table['goals_conceded']
+    points = 3 * table['wins'] + table['draws']
+
+    # Ranked by points, goals difference and goals scored
+    order = np.lexsort((table['team'].values, -table['goals_scored'].values,
+                        -table['goals_difference'].values, -points.values,
+                        table['league_match'].values, table['season'].values))
+    table = table.iloc[order]
+    table = table.assign(rank_pos=table.groupby(['season',
+                                                'league_match']).cumcount() + 1)
+    table = table.sort_values(['season', 'league_match', 'team'])
+
+    return table[RANKING_COLS].reset_index(drop=True)
+
+def compute_standings(results: pd.DataFrame
+                    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Derives the general, home and away rankings after every league match
+    from the results with scores
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        Results with the goals of both teams
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        General, home and away rankings
+    """
+    matches = get_match_statistics(results)
+
+    # Every team of the season appears in the standings of every league match
+    teams = pd.concat([
+        results[['season', team]].rename(columns={team: 'team'})
+        for team in ('team_1', 'team_2')
+    ]).drop_duplicates()
+    league_matches = results[['season', 'league_match']].drop_duplicates()
+    grid = teams.merge(league_matches, on='season')
+    grid = pd.MultiIndex.from_frame(grid.sort_values(['season', 'team',
+                                                    'league_match']))
+
+    general = compute_standings_table(matches, grid)
+    home = compute_standings_table(matches[matches['venue'] == 'home'], grid)
+    away = compute_standings_table(matches[matches['venue'] == 'away'], grid)
+
+    return general, home, away
+
+def validate_standings(derived: pd.DataFrame, scraped: pd.DataFrame,
+                        columns: List[str] = STANDINGS_STATS + ['goals_difference']
+                        ) -> pd.DataFrame:
+    """
+    Compares the derived standings with the scraped ones
+
+    Parameters
+    ----------
+    derived : pd.DataFrame
+        Standings derived from the results
+    scraped : pd.DataFrame
+        Scraped standings
+    columns : List[str]
+        Columns to compare. The rank position is not compared by default
+        because the tie-breakers of the league (head to head) are not
+        reproduced.
+
+    Returns
+    -------
+    pd.DataFrame
+        Scraped rows which are missing or different in the derived
+        standings, along with the derived values
+    """
+    keys = ['season', 'league_match', 'team']
+    data = scraped[keys + columns].merge(derived[keys + columns], how='left',
+                                        on=keys, suffixes=('', '_derived'),
+                                        indicator=True)
+
+    different = (data['_merge'] == 'left_only').values
+
+    for column in columns:
+        different |= (data[column] != data[f'{column}_derived']).values
+
+    return data.loc[different].drop('_merge', axis=1)
+
+def to_records(ranking: pd.DataFrame) -> List[Tuple]:
+    """
+    Converts a ranking to the tuples inserted into the database
+    """
+    return [tuple(int(value) if isinstance(value, np.integer) else value
+                for value in row)
+            for row in ranking[RANKING_COLS].itertuples(index=False)]
@@ -1,9 +1,12 @@
 from sklearn.model_selection import train_test_split
-from typing import List, Tuple, Type
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Type
 
 import pandas as pd
 import numpy as np
 
+from src.preprocessing.config import RANKING_DTYPES, RESULTS_DTYPES, TEAM_COLS
+
 class FeaturePipeline():
     """
     Pipeline to apply sequential data preprocesses
@@ -49,6 +52,218 @@ class FeaturePipeline():
     def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         return self.transform(dataframe)
 
+class SeasonParallelPipeline():
+    """
+    Runs a feature pipeline independently for each season in a pool of
+    processes. The results and ranking tables are partitioned by season, so
+    each partition only carries the rankings it needs.
+
+    Arguments
+    ---------
+    pipeline_factory : Callable
+        Module level function which creates the feature pipeline from the
+        ranking tables, e.g. get_feature_pipeline.
+    rankings : List[pandas.DataFrame]
+        Ranking tables passed to the pipeline factory.
+    n_workers : int, optional
+        Number of processes. By default it uses all the CPUs.
+
+    Attributes
+    ----------
+    _pipeline_factory : Callable
+        Function which creates the feature pipeline.
+    _rankings : List[pandas.DataFrame]
+        Ranking tables passed to the pipeline factory.
+    _season_rankings : List[Dict[int, pandas.DataFrame]]
+        Ranking tables partitioned by season.
+    _n_workers : int, optional
+        Number of processes.
+    """
+    def __init__(self, pipeline_factory: Callable,
+                rankings: List[pd.DataFrame],
+                n_workers: Optional[int] = None) -> None:
+        self._pipeline_factory = pipeline_factory
+        self._rankings = rankings
+        self._season_rankings = [dict(tuple(ranking.groupby('season')))
+                                for ranking in rankings]
+        self._n_workers = n_workers
+
+    def _get_rankings(self, season: int) -> List[pd.DataFrame]:
+        # Seasons without ranking get an empty table with the same columns
+        return [season_rankings.get(season, ranking.iloc[:0])
+                for ranking, season_rankings in zip(self._rankings,
+                                                    self._season_rankings)]
+
+    def transform(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transform a dataset running the pipeline for every season in parallel
+
+        Parameters
+        ----------
+        dataframe : pandas.DataFrame
+            Data to be transformed.
+
+        Returns
+        -------
+        dataframe : pandas.DataFrame
+            Transformed data, in the same order as the input.
+        """
+        if not isinstance(dataframe, pd.DataFrame):
+            raise TypeError('The data must be a pandas.DataFrame')
+
+        seasons = dataframe.groupby('season').indices
+
+        if not seasons:
+            return self._pipeline_factory(*self._rankings)(dataframe)
+
+        partitions = [(self._pipeline_factory, self._get_rankings(season),
+                        dataframe.iloc[positions])
+                        for season, positions in seasons.items()]
+
+        if self._n_workers == 1:
+            data = [run_partition(partition) for partition in partitions]
+        else:
+            with ProcessPoolExecutor(max_workers=self._n_workers) as executor:
+                data = list(executor.map(run_partition, partitions))
+
+        # Restores the input order, so the output does not depend on the
+        # partitioning
+        positions = np.concatenate(list(seasons.values()))
+        data = pd.concat(data)
+        data = data.iloc[np.argsort(positions, kind='stable')]
+
+        return data
+
+    def __call__(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return self.transform(dataframe)
+
+def run_partition(partition: Tuple[Callable, List[pd.DataFrame], pd.DataFrame]
+                    ) -> pd.DataFrame:
+    """
+    Creates a feature pipeline from a partition's rankings and transforms
+    its data
+
+    Parameters
+    ----------
+    partition : Tuple[Callable, List[pd.DataFrame], pd.DataFrame]
+        Pipeline factory, ranking tables and data to be transformed
+
+    Returns
+    -------
+    pd.DataFrame
+        Transformed data
+    """
+    pipeline_factory, rankings, dataframe = partition
+    pipeline = pipeline_factory(*rankings)
+
+    return pipeline(dataframe)
+
+def group_by_season(chunks: Iterator[pd.DataFrame]
+                    ) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    Regroups a stream of chunks ordered by season into one dataframe per
+    season
+
+    Parameters
+    ----------
+    chunks : Iterator[pandas.DataFrame]
+        Chunks ordered by season
+
+    Yields
+    ------
+    Tuple[int, pandas.DataFrame]
+        Season and its rows
+    """
+    buffer = []
+
+    for chunk in chunks:
+        seasons = chunk['season'].values
+        boundaries = np.flatnonzero(seasons[1:] != seasons[:-1]) + 1
+
+        for start, end in zip(np.concatenate([[0], boundaries]),
+                                np.concatenate([boundaries, [len(chunk)]])):
+            if start == end:
+                continue
+
+            piece = chunk.iloc[start:end]
+
+            # A new season starts, the buffered one is complete
+            if buffer and buffer[0]['season'].iloc[0] != piece['season'].iloc[0]:
+                yield buffer[0]['season'].iloc[0], pd.concat(buffer,
+                                                            ignore_index=True)
+                buffer = []
+
+            buffer.append(piece)
+
+    if buffer:
+        yield buffer[0]['season'].iloc[0], pd.concat(buffer, ignore_index=True)
+
+def get_teams_dtype(teams: Iterable[str]) -> pd.CategoricalDtype:
+    """
+    Builds the dtype of the team columns. The teams are sorted, so the
+    dtype does not depend on the order they were read.
+    """
+    return pd.CategoricalDtype(sorted(set(teams)))
+
+def get_teams(results: pd.DataFrame, rankings: List[pd.DataFrame]) -> List[str]:
+    """
+    Gets the teams of the results and the ranking tables
+    """
+    teams = set(results['team_1']) | set(results['team_2'])
+
+    for ranking in rankings:
+        teams |= set(ranking['team'])
+
+    return sorted(teams)
+
+def apply_dtypes(results: pd.DataFrame, rankings: List[pd.DataFrame],
+                teams_dtype: Optional[pd.CategoricalDtype] = None
+                ) -> Tuple[pd.DataFrame, List[pd.DataFrame]]:
+    """
+    Applies the dtypes policy to the results and the ranking tables. All the
+    team columns share the same categories, so they can be compared and
+    joined by their codes.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results dataframe
+    rankings : List[pandas.DataFrame]
+        Ranking tables
+    teams_dtype : pandas.CategoricalDtype, optional
+        Dtype of the team columns, e.g. with all the teams of the database
+        so every season or batch gets the same categories. By default it
+        has the teams of the given tables.
+
+    Returns
+    -------
+    Tuple[pandas.DataFrame, List[pandas.DataFrame]]
+        Results and ranking tables with the new dtypes
+
+    Raises
+    ------
+    ValueError
+        If there are teams which are not in the teams dtype
+    """
+    teams = set(get_teams(results, rankings))
+
+    if teams_dtype is None:
+        teams_dtype = get_teams_dtype(teams)
+    elif not teams <= set(teams_dtype.categories):
+        raise ValueError(f'Teams without category: '
+                        f'{sorted(teams - set(teams_dtype.categories))}')
+
+    # Only the retrieved columns are converted
+    def get_dtypes(dtypes, columns):
+        return {column: teams_dtype if column in TEAM_COLS else dtype
+                for column, dtype in dtypes.items() if column in columns}
+
+    results = results.astype(get_dtypes(RESULTS_DTYPES, results.columns))
+    rankings = [ranking.astype(get_dtypes(RANKING_DTYPES, ranking.columns))
+                for ranking in rankings]
+
+    return results, rankings
+
 def get_training_test_sets(
     df : pd.DataFrame
     ) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray, np.ndarray]:
@@ -72,7 +287,7 @@ def get_training_test_sets(
         Test set targets
     """
     # Encode categorical target
-    y = df['outcome'].replace({
+    y = df['outcome'].astype(object).replace({
         'team_1': 0,
         'team_2': 1,
         'draw': 2
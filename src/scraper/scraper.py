@@ -97,12 +97,16 @@ class Scraper():
         self._process.crawl(GeneralDataSpider,
                             outputResponse=info,
                             start_urls=soccer_urls)
-        self._process.crawl(HomeDataSpider,
-                            outputResponse=info,
-                            start_urls=home_urls)
-        self._process.crawl(AwayDataSpider,
-                            outputResponse=info,
-                            start_urls=away_urls)
+
+        # The home and away rankings can be derived from the results instead
+        if self._config.get('scrape_home_away', True):
+            self._process.crawl(HomeDataSpider,
+                                outputResponse=info,
+                                start_urls=home_urls)
+            self._process.crawl(AwayDataSpider,
+                                outputResponse=info,
+                                start_urls=away_urls)
+
         self._process.start()
 
         return info
\ No newline at end of file
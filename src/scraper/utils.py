@@ -24,9 +24,9 @@ class DataParser():
             
         return cleaned_data
 
-    def parse_general_data(self, data: List):
+    def parse_general_data(self, data: List, with_scores: bool = False):
         cleaned_ranking, cleaned_results = [], []
-        results_parser = ResultsDataParser()
+        results_parser = ResultsDataParser(with_scores)
         ranking_parser = RankingDataParser()
         
         for element in data:
@@ -102,8 +102,9 @@ class RankingDataParser():
         return parsed_data
 
 class ResultsDataParser():
-    def __init__(self) -> None:
-        pass
+    def __init__(self, with_scores: bool = False) -> None:
+        # Whether to add the goals of both teams to the parsed results
+        self._with_scores = with_scores
 
     def parse_results(self, data, season, league_match):
         parsed_results = []
@@ -116,13 +117,16 @@ class ResultsDataParser():
 
                 try:
                     outcome = self.parse_outcome(result, league_match)
-                    if self.is_second_round(league_match):
-                        home = 'team_2'
-                    else:
-                        home = 'team_1'
+                    # The home team is always listed first
+                    home = 'team_1'
+
+                    parsed_result = (int(season), int(league_match),
+                                    home, home_team, away_team, outcome)
 
-                    parsed_results.append((int(season), int(league_match),
-                                        home, home_team, away_team, outcome))
+                    if self._with_scores:
+                        parsed_result += self.parse_score(result, league_match)
+
+                    parsed_results.append(parsed_result)
                 except ValueError:
                     pass
                 
@@ -140,14 +144,22 @@ class ResultsDataParser():
         except:
             outcome = 'NA'
 
-        if self.is_second_round(league_match): # Is first round
-            if outcome == 'team_1':
-                return 'team_2'
-            elif outcome == 'team_2':
-                return 'team_1'
-        
         return outcome
     
+    def parse_score(self, result, league_match):
+        """
+        Gets the goals of team_1 and team_2, the home and the away team. The
+        goals are None if the match was not played.
+        """
+        result = result.split(' ')[0]
+
+        try:
+            home_goals, visitor_goals = (int(goals) for goals in result.split(':'))
+        except ValueError:
+            return None, None
+
+        return home_goals, visitor_goals
+
     def get_outcome(self, home_goals, visitor_goals):
         if home_goals > visitor_goals:
             return 'team_1'
@@ -157,9 +169,6 @@ class ResultsDataParser():
             return 'draw'
         else:
             return 'NA'    
-        
-    def is_second_round(self, league_match):
-        return int(league_match) >= 20
 
 def normalize_unicode(word):
     normalMap = {'À': 'A', 'Á': 'A', 'Â': 'A', 'Ã': 'A', 'Ä': 'A',
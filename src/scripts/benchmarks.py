@@ -0,0 +1,190 @@
+from src.config.config import CODE_DIR, DATA_DIR
+from src.config.logger_config import logger
+from src.preprocessing.model_preprocessing import (
+    compile_pipeline,
+    feature_eng_pipeline,
+    fit_and_process_data
+)
+from src.preprocessing.data_retriever import DataRetriever
+from src.preprocessing.utils import get_training_test_sets
+from src.training.utils import get_features_array, get_object_from_str
+from sklearn.metrics import accuracy_score
+from pathlib import Path
+
+import argparse
+from itertools import product
+import time
+import numpy as np
+import pandas as pd
+import yaml
+
+def benchmark_dtype(data: pd.DataFrame, config: dict, dtype: str) -> dict:
+    """
+    Preprocesses the data, trains and tests the model using the given
+    floating point type
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Features computed by the data preparation pipeline
+    config : dict
+        Model configuration
+    dtype : str
+        Floating point type of the model features
+
+    Returns
+    -------
+    dict
+        Memory of the training and test arrays, timings and accuracy
+    """
+    X_train, X_test, y_train, y_test = get_training_test_sets(data)
+    pipeline = feature_eng_pipeline(dtype)
+    X_train, X_test, y_train, y_test = fit_and_process_data(pipeline,
+                                                            (X_train, y_train),
+                                                            (X_test, y_test))
+
+    # Same layout as the arrays returned by load_data
+    X_train = get_features_array(X_train.assign(outcome=y_train), dtype)
+    X_test = get_features_array(X_test.assign(outcome=y_test), dtype)
+
+    model = get_object_from_str(config['model'])(**config['params'])
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preds = model.predict(X_test)
+    predict_time = time.perf_counter() - start
+
+    return {
+        'dtype': dtype,
+        'memory_mb': (X_train.nbytes + X_test.nbytes) / 2**20,
+        'fit_s': fit_time,
+        'predict_s': predict_time,
+        'test_acc': accuracy_score(y_test, preds),
+        'pipeline': pipeline,
+        'preds': preds
+    }
+
+def benchmark_float32(data: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """
+    Compares the float64 and float32 modes on the same training and test
+    sets
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Features computed by the data preparation pipeline
+    config : dict
+        Model configuration
+
+    Returns
+    -------
+    pd.DataFrame
+        Metrics of both modes
+    """
+    reports = [benchmark_dtype(data, config, dtype)
+                for dtype in ('float64', 'float32')]
+
+    # Serving: compiled pipelines of both modes over the same raw features
+    X = data.drop('outcome', axis=1)
+    transformed = [compile_pipeline(report['pipeline']).transform(X)
+                    for report in reports]
+    max_error = np.abs(transformed[0] - transformed[1]).max()
+    agreement = (reports[0]['preds'] == reports[1]['preds']).mean()
+
+    logger.info(f'Float32 benchmark: max absolute difference of the served '
+                f'features {max_error:.2e}, {agreement:.2%} of the test '
+                f'predictions agree')
+
+    metrics = pd.DataFrame([{key: value for key, value in report.items()
+                            if key not in ('pipeline', 'preds')}
+                            for report in reports])
+
+    return metrics
+
+def benchmark_retrieval(db_config: Path, methods=('orm', 'sql', 'copy'),
+                        repeat: int = 3) -> pd.DataFrame:
+    """
+    Compares the retrieval methods of DataRetriever.get_historical_data,
+    reading the tables one after another and concurrently
+
+    Parameters
+    ----------
+    db_config : Path
+        Database configuration file
+    methods : Tuple[str]
+        Retrieval methods, the first one is the reference
+    repeat : int
+        Number of reads per method, the best time is kept
+
+    Returns
+    -------
+    pd.DataFrame
+        Best time and whether the data equals the reference one
+    """
+    retriever = DataRetriever(db_config)
+    metrics, reference = [], None
+
+    for method, concurrent in product(methods, (False, True)):
+        times = []
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = retriever.get_historical_data(method=method,
+                                                concurrent=concurrent)
+            times.append(time.perf_counter() - start)
+
+        if reference is None:
+            reference = data
+
+        metrics.append({
+            'method': method,
+            'concurrent': concurrent,
+            'rows': sum(len(df) for df in data),
+            'time_s': min(times),
+            'equal': all(df.equals(expected)
+                        for df, expected in zip(data, reference))
+        })
+
+    return pd.DataFrame(metrics)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    float32_parser = subparsers.add_parser('float32',
+                                            help='Float32 mode benchmark')
+    float32_parser.add_argument('--data', default=Path(DATA_DIR,
+                                                    'features_data.parquet'),
+                                help='Features parquet or csv file')
+    float32_parser.add_argument('--config',
+                                default=Path(CODE_DIR,
+                                            'training/model_config.yaml'),
+                                help='Model configuration file')
+
+    retrieval_parser = subparsers.add_parser('retrieval',
+                                            help='Retrieval methods benchmark')
+    retrieval_parser.add_argument('--db-config',
+                                default=Path(CODE_DIR, 'db/db_config.yml'),
+                                help='Database configuration file')
+    args = parser.parse_args()
+
+    if args.benchmark == 'float32':
+        if str(args.data).endswith('.csv'):
+            data = pd.read_csv(args.data)
+        else:
+            data = pd.read_parquet(args.data)
+
+        with open(args.config) as file:
+            config = yaml.full_load(file)
+
+        # Fixed seed so both modes train the same model
+        config['params'].setdefault('random_state', 42)
+
+        metrics = benchmark_float32(data, config)
+    else:
+        metrics = benchmark_retrieval(args.db_config)
+
+    print(metrics.to_string(index=False))
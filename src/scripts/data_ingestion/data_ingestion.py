@@ -1,7 +1,8 @@
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import yaml
 import argparse
+import pandas as pd
 
 from src.config.logger_config import logger
 from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
@@ -9,6 +10,13 @@ from src.db.manager import DBManager
 from src.scraper.scraper import Scraper
 from src.scraper.utils import DataParser
 from src.config.config import SCRAPER_CONFIG_FILE, CODE_DIR
+from src.preprocessing.config import RANKING_COLS, RESULTS_COLS
+from src.preprocessing.standings import (
+    compute_standings,
+    validate_standings,
+    to_records,
+    RESULTS_WITH_SCORES_COLS
+)
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -25,9 +33,19 @@ def retrieve_data(config: Optional[Dict] = None):
     parser = DataParser()
 
     logger.info('Parsing data')
-    general_ranking, results = parser.parse_general_data(data['general'])
-    home_ranking = parser.parse_home_away_data(data['home'])
-    away_ranking = parser.parse_home_away_data(data['away'])
+
+    if config.get('scrape_home_away', True):
+        general_ranking, results = parser.parse_general_data(data['general'])
+        home_ranking = parser.parse_home_away_data(data['home'])
+        away_ranking = parser.parse_home_away_data(data['away'])
+    else:
+        # The standings are accumulated from the first league match
+        if config['start_league_match'] != 1:
+            raise ValueError('The home and away rankings can only be derived '
+                            'when scraping from the first league match')
+
+        general_ranking, results, home_ranking, away_ranking = derive_rankings(
+                                        parser, data['general'])
 
     data = {
         'general_ranking': general_ranking,
@@ -38,21 +56,70 @@ def retrieve_data(config: Optional[Dict] = None):
 
     return data
 
-def ingest_data(data: Dict):
-    logger.info('Inserting results')
-    insert_data(data['results'], Results)
-    logger.info('Inserting general ranking')
-    insert_data(data['general_ranking'], GeneralRanking)
-    logger.info('Inserting home ranking')
-    insert_data(data['home_ranking'], HomeRanking)
-    logger.info('Inserting away ranking')
-    insert_data(data['away_ranking'], AwayRanking)
-
-def insert_data(data: List, table):
+def derive_rankings(parser: DataParser, general_data: List) -> Tuple[List, ...]:
+    """
+    Derives the home and away rankings from the results with scores, and
+    validates the derived general ranking against the scraped one
+
+    Raises
+    ------
+    ValueError
+        If the derived general ranking differs from the scraped one, so the
+        derived tables are not inserted
+    """
+    general_ranking, results = parser.parse_general_data(general_data,
+                                                        with_scores=True)
+    results_df = pd.DataFrame(results, columns=RESULTS_WITH_SCORES_COLS)
+    general_df = pd.DataFrame(general_ranking, columns=RANKING_COLS)
+
+    derived_general, home_df, away_df = compute_standings(results_df)
+
+    mismatches = validate_standings(derived_general, general_df)
+
+    if len(mismatches) > 0:
+        raise ValueError(f'{len(mismatches)} derived general ranking rows '
+                        f'differ from the scraped ones\n{mismatches.to_string()}')
+
+    # The results are stored without the scores
+    results = [result[:len(RESULTS_COLS)] for result in results]
+
+    return general_ranking, results, to_records(home_df), to_records(away_df)
+
+def ingest_data(data: Dict, bulk: bool = False):
+    # The same manager, and its pooled connections, loads all the tables
     manager = DBManager(os.path.join(CODE_DIR, 'db/db_config.yml'))
 
-    manager.insert(data, table)
-    manager.close()
+    try:
+        logger.info('Inserting results')
+        insert_data(data['results'], Results, manager, bulk)
+        logger.info('Inserting general ranking')
+        insert_data(data['general_ranking'], GeneralRanking, manager, bulk)
+        logger.info('Inserting home ranking')
+        insert_data(data['home_ranking'], HomeRanking, manager, bulk)
+        logger.info('Inserting away ranking')
+        insert_data(data['away_ranking'], AwayRanking, manager, bulk)
+    finally:
+        manager.close()
+
+def insert_data(data: List, table, manager: Optional[DBManager] = None,
+                bulk: bool = False):
+    # The manager is only closed here when it is created here
+    owns_manager = manager is None
+
+    if owns_manager:
+        manager = DBManager(os.path.join(CODE_DIR, 'db/db_config.yml'))
+
+    try:
+        # The COPY loader is opt-in, see DBManager.bulk_insert
+        if bulk:
+            inserted, skipped = manager.bulk_insert(data, table)
+            logger.info(f'{table.__tablename__}: {inserted} rows inserted, '
+                        f'{skipped} already existing rows skipped')
+        else:
+            manager.insert(data, table)
+    finally:
+        if owns_manager:
+            manager.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -61,10 +128,12 @@ if __name__ == '__main__':
                     type=str,
                     default='actual', required=True,
                     help='Scraper config file')
+    parser.add_argument('--bulk-insert', action='store_true',
+                    help='Loads the data with COPY into a staging table')
     args = parser.parse_args()
 
     with open(args.config_file) as file:
         config = yaml.full_load(file)
 
     data = retrieve_data(config)
-    ingest_data(data)
\ No newline at end of file
+    ingest_data(data, bulk=args.bulk_insert)
\ No newline at end of file
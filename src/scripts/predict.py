@@ -9,6 +9,7 @@ from pathlib import Path
 from src.scraper.scraper import Scraper
 from src.scraper.utils import DataParser
 from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.ratings import get_required_rating
 from src.preprocessing.model_preprocessing import ModelPreprocesser
 from src.config.config import CODE_DIR, DATA_DIR
 from src.config.logger_config import logger
@@ -39,7 +40,8 @@ def load_data():
 
     logger.info('CREATING FEATURES')
     feature_pipeline = get_feature_pipeline(general_df, home_df,
-                                            away_df)
+                                            away_df,
+                                            rating=get_required_rating())
     data = feature_pipeline(results_df)
 
     logger.info('CREATING PREPROCESSING PIPELINE')
@@ -1,7 +1,7 @@
 from pathlib import Path
 import pickle
 from src.config.logger_config import logger
-from src.config.config import DATA_DIR
+from src.config.config import DATA_DIR, FEATURES_DTYPE
 from sklearn.metrics import accuracy_score
 from sklearn.model_selection import cross_val_score
 
@@ -12,23 +12,40 @@ import yaml
 import importlib
 import mlflow
 import mlflow.sklearn
+import numpy as np
 import pandas as pd
 
-def load_data():
-    training_data_path = Path(DATA_DIR, 'training_data.parquet')
-    test_data_path = Path(DATA_DIR, 'test_data.parquet')
+def load_data(dtype: str = FEATURES_DTYPE, data_dir: Path = DATA_DIR):
+    training_data_path = Path(data_dir, 'training_data.parquet')
+    test_data_path = Path(data_dir, 'test_data.parquet')
 
     training_df = pd.read_parquet(training_data_path)
     test_df = pd.read_parquet(test_data_path)
     
     y_train = training_df['outcome'].values
-    X_train = training_df.drop(['outcome', 'created_on'], axis=1).values
+    X_train = get_features_array(training_df, dtype)
 
     y_test = test_df['outcome'].values
-    X_test = test_df.drop(['outcome', 'created_on'], axis=1).values
+    X_test = get_features_array(test_df, dtype)
 
     return X_train, X_test, y_train, y_test
 
+def get_features_array(df: pd.DataFrame, dtype: str) -> np.ndarray:
+    """
+    Gets the features as a C-contiguous array of the given type, without
+    the outcome and timestamp columns. The dataframe is not modified.
+    """
+    columns = [column for column in df.columns
+                if column not in ('outcome', 'created_on')]
+    # The columns are selected and converted at once, usually in a new
+    # C-contiguous array which is not copied again
+    features = df[columns].to_numpy(dtype=dtype, copy=False)
+
+    if not features.flags['C_CONTIGUOUS']:
+        features = np.ascontiguousarray(features)
+
+    return features
+
 def train_model(config, X_train, X_test, y_train, y_test):
     with open(config) as file:
         config = yaml.full_load(file)
@@ -4,6 +4,12 @@ import pandas as pd
 import numpy as np
 import os
 
+from sqlalchemy import insert
+
+from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
+from src.db.manager import dispose_engines, get_config, get_engine
+from src.db.migrations import create_schema
+
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 @fixture
@@ -40,4 +46,27 @@ def get_features_df():
     results_trans_dir = os.path.join(THIS_DIR, 'results_1999_transformed.csv')
     results_trans = pd.read_csv(results_trans_dir)
 
-    return results, general_ranking, home_ranking, away_ranking, results_trans
\ No newline at end of file
+    return results, general_ranking, home_ranking, away_ranking, results_trans
+
+@fixture
+def get_sqlite_db(get_features_df, tmp_path):
+    """
+    SQLite database with the 1999 season tables, created with the
+    migrations
+    """
+    results, general, home, away, _ = get_features_df
+
+    config_file = tmp_path / 'db_config.yml'
+    config_file.write_text(f'db_engine: sqlite\ndb_name: {tmp_path / "test.db"}\n')
+
+    create_schema(config_file)
+    engine = get_engine(get_config(config_file))
+
+    with engine.begin() as connection:
+        for data, table in ((results, Results), (general, GeneralRanking),
+                            (home, HomeRanking), (away, AwayRanking)):
+            connection.execute(insert(table), data.to_dict('records'))
+
+    yield config_file, engine
+
+    dispose_engines()
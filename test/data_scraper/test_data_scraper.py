@@ -3,7 +3,7 @@ import os
 import yaml
 
 from src.scraper.scraper import Scraper
-from src.scraper.utils import DataParser
+from src.scraper.utils import DataParser, ResultsDataParser
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 SCRAPER_CONFIG = os.path.join(THIS_DIR, 'test_scraper_config.yml')
@@ -28,4 +28,17 @@ def test_parse_data():
     assert general_ranking[0][:4] == (1999, 1, 1, 'Deportivo')
     assert home_ranking[0][:4] == (1999, 1, 1, 'Deportivo')
     assert away_ranking[0][:4] == (1999, 1, 1, 'Rayo')
-    assert results[0][:3] == (1999, 1, 'team_1')
\ No newline at end of file
+    assert results[0][:3] == (1999, 1, 'team_1')
+
+def test_parse_second_round_results():
+    """
+    Test the home team is team_1 and the goals and outcome are not swapped
+    in the second round
+    """
+    data = ['Sevilla', '-', 'Betis', '2:1 (1:0)', 'Celta', '-', 'Malaga', '0:3 (0:1)']
+    parser = ResultsDataParser(with_scores=True)
+
+    assert parser.parse_results(data, '1999', '20') == [
+        (1999, 20, 'team_1', 'Sevilla', 'Betis', 'team_1', 2, 1),
+        (1999, 20, 'team_1', 'Celta', 'Malaga', 'team_2', 0, 3)
+    ]
@@ -0,0 +1,6 @@
+"""
+Database tests. The SQLite ones always run, the PostgreSQL ones are skipped
+unless TEST_DB_CONFIG points to the config file of a test database, e.g.
+the postgres service of src/db/docker-compose.yml. The 1999 season rows of
+that database are replaced by the test data.
+"""
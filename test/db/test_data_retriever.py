@@ -0,0 +1,120 @@
+import pytest
+import pandas as pd
+
+from pandas._testing import assert_frame_equal
+from sqlalchemy import insert
+
+from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
+from src.preprocessing.data_retriever import DataRetriever
+from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.materialization import FeatureTable
+from src.preprocessing.utils import get_teams_dtype
+from test.data.data_fixtures import get_features_df, get_sqlite_db
+
+def add_season(engine, tables, season, teams):
+    """
+    Inserts a copy of the tables as a new season with other teams' names
+    """
+    for data, table in zip(tables, (Results, GeneralRanking, HomeRanking,
+                                    AwayRanking)):
+        data = data.assign(season=season).replace(teams)
+
+        with engine.begin() as connection:
+            connection.execute(insert(table), data.to_dict('records'))
+
+def test_stream_categories(get_features_df, get_sqlite_db, tmp_path):
+    """
+    Test the features computed season by season keep the same categorical
+    dtype although the teams change
+    """
+    results, general, home, away, _ = get_features_df
+    config_file, engine = get_sqlite_db
+
+    add_season(engine, (results, general, home, away), 2000,
+                {'Alaves': 'Almeria', 'Betis': 'Eibar'})
+    retriever = DataRetriever(config_file)
+
+    def compute_features():
+        for results, general, home, away in retriever.stream_historical_data(
+                                                            chunk_size=500):
+            assert results['team_1'].dtype == retriever.get_teams_dtype()
+
+            yield get_feature_pipeline(general, home, away)(results)
+
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+    feature_table.save_chunks(compute_features())
+    data = feature_table.load()
+
+    assert data['season'].unique().tolist() == [1999, 2000]
+    assert data['team_1'].dtype == retriever.get_teams_dtype()
+    assert {'Alaves', 'Almeria'} <= set(data['team_1'])
+
+def test_incremental_categories(get_features_df, get_sqlite_db, tmp_path):
+    """
+    Test the features appended after a new team appears stay categorical
+    """
+    results, general, home, away, _ = get_features_df
+    config_file, engine = get_sqlite_db
+    retriever = DataRetriever(config_file)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+
+    results, general, home, away = retriever.get_historical_data(method='sql')
+    feature_table.save(get_feature_pipeline(general, home, away)(results))
+
+    add_season(engine, get_features_df[:4], 2000, {'Alaves': 'Almeria'})
+
+    # The teams of the whole history are not read again
+    def select_distinct(columns):
+        raise AssertionError('The teams of the whole history were read')
+
+    retriever._db_manager.select_distinct = select_distinct
+    teams = feature_table.get_teams()
+    results, general, home, away = retriever.get_data_since(
+                                        *feature_table.get_watermark(),
+                                        teams=teams)
+
+    assert list(results['team_1'].dtype.categories) == sorted(teams + ['Almeria'])
+
+    data = feature_table.append(get_feature_pipeline(general, home, away)(
+                                    feature_table.get_new_results(results)))
+
+    assert len(data) == 2 * len(get_features_df[0])
+    assert data['team_1'].dtype == results['team_1'].dtype
+    assert isinstance(data['team_1'].dtype, pd.CategoricalDtype)
+    assert isinstance(data['outcome'].dtype, pd.CategoricalDtype)
+    assert 'Almeria' in set(data['team_2'])
+
+def test_round_rankings(get_features_df, get_sqlite_db):
+    """
+    Test the rankings before a round are retrieved with the dtypes of the
+    whole tables, the categories being the teams of the round, and give the
+    features of the round
+    """
+    results, general, _, _, expected_results = get_features_df
+    config_file, _ = get_sqlite_db
+    retriever = DataRetriever(config_file)
+
+    round_results = results[results['league_match'] == 20].reset_index(drop=True)
+    general_df, home_df, away_df = retriever.get_round_rankings(round_results)
+    _, expected, _, _ = retriever.get_historical_data(method='sql')
+
+    teams = set(round_results['team_1']) | set(round_results['team_2'])
+
+    assert set(general_df['team']) == set(home_df['team']) == teams
+    assert (general_df['league_match'] == 19).all()
+    assert general_df['team'].dtype == get_teams_dtype(teams)
+    assert general_df.dtypes.drop('team').to_dict() == \
+            expected.dtypes.drop('team').to_dict()
+
+    expected = expected[expected['league_match'] == 19]
+    assert_frame_equal(general_df.sort_values('team').reset_index(drop=True),
+                        expected.sort_values('team').reset_index(drop=True),
+                        check_categorical=False)
+
+    # The rankings of the round give the same features as the whole tables
+    features = get_feature_pipeline(general_df, home_df, away_df)(round_results)
+    expected_results = expected_results[expected_results['league_match'] == 20]
+
+    # The expected features were computed from untyped rankings
+    assert_frame_equal(features, expected_results.reset_index(drop=True),
+                        check_dtype=False)
@@ -0,0 +1,155 @@
+"""
+Database tests, they are skipped unless TEST_DB_CONFIG points to the config
+file of a test database, e.g. test/db/test_db_config.yml for the postgres
+service of the CI workflow and of src/db/docker-compose.yml. The 1999
+season rows of the database are replaced by the test data.
+"""
+import os
+import pytest
+
+from pandas._testing import assert_frame_equal, assert_series_equal
+from sqlalchemy import delete, insert
+
+from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
+from src.db.manager import DBManager, get_config, get_engine
+from src.db.migrations import (
+    create_schema,
+    create_feature_view,
+    drop_feature_view,
+    refresh_feature_view
+)
+from src.preprocessing.data_retriever import DataRetriever
+from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.standings import to_records
+from src.scripts.data_ingestion.data_ingestion import insert_data
+from test.data.data_fixtures import get_features_df
+
+TEST_DB_CONFIG = os.getenv('TEST_DB_CONFIG')
+
+pytestmark = pytest.mark.skipif(TEST_DB_CONFIG is None,
+                                reason='TEST_DB_CONFIG is not set')
+
+
+@pytest.fixture
+def postgres_db(get_features_df):
+    results, general, home, away, expected_results = get_features_df
+
+    create_schema(TEST_DB_CONFIG)
+    engine = get_engine(get_config(TEST_DB_CONFIG))
+    drop_feature_view(engine)
+
+    with engine.begin() as connection:
+        for table in (Results, GeneralRanking, HomeRanking, AwayRanking):
+            connection.execute(delete(table).where(table.season == 1999))
+
+    manager = DBManager(TEST_DB_CONFIG)
+
+    yield manager, engine, get_features_df
+
+    drop_feature_view(engine)
+    manager.close()
+
+def test_bulk_insert(postgres_db):
+    """
+    Test the existing rows are skipped
+    """
+    manager, _, (results, general, _, _, _) = postgres_db
+    records = list(results.itertuples(index=False, name=None))
+
+    assert manager.bulk_insert(records[:100], Results, batch_size=30) == (100, 0)
+    assert manager.bulk_insert(records, Results, batch_size=30) == (len(records) - 100, 100)
+    assert manager.bulk_insert(to_records(general), GeneralRanking) == (len(general), 0)
+
+def test_insert_data(postgres_db):
+    """
+    Test the default and the COPY loaders load the same rows, skipping
+    the existing ones
+    """
+    manager, _, (results, general, _, _, _) = postgres_db
+    records = list(results.itertuples(index=False, name=None))
+
+    insert_data(records[:100], Results, manager)
+    insert_data(records, Results, manager, bulk=True)
+    insert_data(records, Results, manager)
+
+    keys = ['season', 'league_match', 'team_1', 'team_2']
+    data = manager.read_dataframe(Results)
+    data = data[data['season'] == 1999].sort_values(keys)
+
+    assert_frame_equal(data.reset_index(drop=True),
+                       results.sort_values(keys).reset_index(drop=True))
+
+def test_read_dataframe_copy(postgres_db):
+    """
+    Test COPY reads the same dataframes as the SQL reads, with the same
+    dtypes
+    """
+    manager, engine, (results, general, home, away, _) = postgres_db
+
+    with engine.begin() as connection:
+        for data, table in ((results, Results), (general, GeneralRanking),
+                            (home, HomeRanking), (away, AwayRanking)):
+            connection.execute(insert(table), data.to_dict('records'))
+
+    for table in (Results, GeneralRanking, HomeRanking, AwayRanking):
+        assert_frame_equal(manager.read_dataframe(table, method='copy'),
+                           manager.read_dataframe(table, method='sql'))
+
+    columns = ['season', 'league_match', 'team', 'wins']
+    data = manager.get_data_since(HomeRanking, 1999, 20, columns, method='copy')
+
+    assert_frame_equal(data, manager.get_data_since(HomeRanking, 1999, 20,
+                                                    columns, method='sql'))
+    assert data['league_match'].min() == 21
+
+    # Matches not played yet, their outcome is 'NA', and empty and null
+    # strings
+    with engine.begin() as connection:
+        connection.execute(insert(Results), [
+            {'season': 1999, 'league_match': 50, 'home': '', 'team_1': 'Betis',
+            'team_2': 'Celta', 'outcome': 'NA'},
+            {'season': 1999, 'league_match': 50, 'home': None, 'team_1': 'Celta',
+            'team_2': 'Betis', 'outcome': 'NA'}
+        ])
+
+    data = manager.get_data_since(Results, 1999, 49, method='copy')
+
+    assert_frame_equal(data, manager.get_data_since(Results, 1999, 49,
+                                                    method='sql'))
+    assert data['outcome'].tolist() == ['NA', 'NA']
+    assert sorted(data['home'].tolist(), key=str) == ['', None]
+
+def test_feature_view(postgres_db):
+    """
+    Test the feature view gives the same features as the feature pipeline,
+    with the same dtypes
+    """
+    manager, engine, (results, general, home, away, expected_results) = postgres_db
+
+    manager.bulk_insert(list(results.itertuples(index=False, name=None)), Results)
+
+    for ranking, table in ((general, GeneralRanking), (home, HomeRanking),
+                           (away, AwayRanking)):
+        manager.bulk_insert(to_records(ranking), table)
+
+    create_feature_view(engine)
+    retriever = DataRetriever(TEST_DB_CONFIG)
+
+    keys = ['season', 'league_match', 'team_1']
+
+    # The pipeline features of the typed tables, the fixture is untyped
+    results_df, general_df, home_df, away_df = retriever.get_historical_data(method='sql')
+    features = get_feature_pipeline(general_df, home_df, away_df)(results_df)
+
+    for method in ('sql', 'copy'):
+        data = retriever.get_feature_view(method=method)
+
+        assert_series_equal(data.dtypes, features.dtypes)
+
+        data = data[data['season'] == 1999].sort_values(keys)
+
+        assert_frame_equal(data.reset_index(drop=True),
+                           expected_results.sort_values(keys).reset_index(drop=True),
+                           check_dtype=False, check_categorical=False)
+
+    assert refresh_feature_view(engine)
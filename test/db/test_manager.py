@@ -0,0 +1,141 @@
+import pytest
+import pandas as pd
+
+from pandas._testing import assert_frame_equal
+
+from src.db.data import Results, GeneralRanking
+from src.db.manager import DBManager
+from test.data.data_fixtures import get_features_df, get_sqlite_db
+
+def test_read_dataframe(get_features_df, get_sqlite_db):
+    """
+    Test the tables are read as dataframes ordered by season and league
+    match
+    """
+    results, general, _, _, _ = get_features_df
+    config_file, _ = get_sqlite_db
+    manager = DBManager(config_file)
+
+    keys = ['season', 'league_match', 'team']
+    expected = general.sort_values(keys).reset_index(drop=True)
+    data = manager.read_dataframe(GeneralRanking, method='sql')
+
+    assert_frame_equal(data.sort_values(keys).reset_index(drop=True), expected)
+    assert data['league_match'].is_monotonic_increasing
+
+    columns = ['season', 'league_match', 'team_1', 'outcome']
+    data = manager.read_dataframe(Results, columns)
+
+    assert list(data.columns) == columns
+    assert len(data) == len(results)
+
+    with pytest.raises(ValueError):
+        manager.read_dataframe(Results, method='orm')
+
+def test_get_data_since(get_features_df, get_sqlite_db):
+    """
+    Test the rows after the watermark are read, with the watermark league
+    match only when it is inclusive
+    """
+    results, _, _, _, _ = get_features_df
+    config_file, _ = get_sqlite_db
+    manager = DBManager(config_file)
+
+    data = manager.get_data_since(Results, 1999, 30)
+    inclusive = manager.get_data_since(Results, 1999, 30, inclusive=True)
+
+    assert data['league_match'].min() == 31
+    assert len(data) == (results['league_match'] > 30).sum()
+    assert len(inclusive) == (results['league_match'] >= 30).sum()
+
+def test_insert_data_closes_manager(monkeypatch):
+    """
+    Test the manager created by insert_data is closed even if the insert
+    fails, and the given managers are left open
+    """
+    from src.scripts.data_ingestion import data_ingestion
+
+    class FailingManager():
+        closed = 0
+
+        def __init__(self, config_file=None):
+            pass
+
+        def insert(self, data, table):
+            raise RuntimeError('Insert failed')
+
+        def close(self):
+            FailingManager.closed += 1
+
+    monkeypatch.setattr(data_ingestion, 'DBManager', FailingManager)
+
+    with pytest.raises(RuntimeError):
+        data_ingestion.insert_data([], Results)
+
+    assert FailingManager.closed == 1
+
+    with pytest.raises(RuntimeError):
+        data_ingestion.insert_data([], Results, FailingManager())
+
+    assert FailingManager.closed == 1
+
+def test_select_rankings(get_features_df, get_sqlite_db):
+    """
+    Test the rankings of many keys are selected at once, once per key
+    """
+    _, general, _, _, _ = get_features_df
+    config_file, _ = get_sqlite_db
+    manager = DBManager(config_file)
+
+    keys = [(1999, 10, 'Alaves'), (1999, 2, 'Betis'), (1999, 10, 'Alaves'),
+            (1999, 0, 'Celta')]
+    rankings = manager.select_rankings(GeneralRanking, keys)
+
+    assert [(ranking.season, ranking.league_match, ranking.team)
+            for ranking in rankings] == [(1999, 2, 'Betis'), (1999, 10, 'Alaves')]
+
+    expected = general[(general['league_match'] == 10)
+                        & (general['team'] == 'Alaves')].iloc[0]
+
+    assert rankings[1].goals_scored == expected['goals_scored']
+    assert manager.select_rankings(GeneralRanking, []) == []
+
+def test_select_results(get_features_df, get_sqlite_db):
+    """
+    Test many results are selected at once with their whole key
+    """
+    results, _, _, _, _ = get_features_df
+    config_file, _ = get_sqlite_db
+    manager = DBManager(config_file)
+
+    keys = list(results[['season', 'league_match', 'team_1', 'team_2']]
+                .head(5).itertuples(index=False, name=None))
+    # The teams swapped are not the same result
+    swapped = [(season, league_match, team_2, team_1)
+                for season, league_match, team_1, team_2 in keys]
+
+    selected = manager.select_results(Results, keys + swapped)
+
+    assert sorted((result.season, result.league_match, result.team_1,
+                    result.team_2) for result in selected) == sorted(keys)
+
+def test_close_keeps_other_sessions(get_sqlite_db):
+    """
+    Test closing a manager does not close the session of another manager
+    of the same database in the same thread
+    """
+    config_file, _ = get_sqlite_db
+    manager = DBManager(config_file)
+    other_manager = DBManager(config_file)
+
+    session = manager._session
+    rankings = manager.select_rankings(GeneralRanking, [(1999, 2, 'Betis')])
+    other_manager.select_rankings(GeneralRanking, [(1999, 2, 'Betis')])
+    other_manager.close()
+
+    assert manager._session is session
+    assert rankings[0] in manager._session
+
+    manager.close()
+
+    assert manager._session is not session
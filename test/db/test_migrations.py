@@ -0,0 +1,223 @@
+import os
+import pytest
+import pandas as pd
+
+from pandas._testing import assert_frame_equal
+from sqlalchemy import insert, inspect, text
+
+from src.db.data import Results, GeneralRanking, HomeRanking, AwayRanking
+from src.db.manager import DBManager, dispose_engines, get_config, get_engine
+from src.db.migrations import (
+    create_schema,
+    create_feature_view,
+    fix_results_orientation,
+    get_partition_ranges,
+    get_partitioned_table_sql,
+    partition_by_season
+)
+from src.preprocessing.standings import to_records
+from test.data.data_fixtures import get_features_df, get_sqlite_db
+
+TEST_DB_CONFIG = os.getenv('TEST_DB_CONFIG')
+TABLES = (Results, GeneralRanking, HomeRanking, AwayRanking)
+
+@pytest.fixture
+def unpartitioned_db(get_features_df, tmp_path):
+    """
+    Database of its own with the unpartitioned tables of the 1999 season and
+    a copy of them as the 2005 season, it is dropped afterwards. The columns
+    of the results table are not in the order of the model.
+    """
+    results, general, home, away, _ = get_features_df
+    config = get_config(TEST_DB_CONFIG)
+    db_name = f'{config["db_name"]}_partitioning'
+
+    def execute(statement):
+        server = get_engine(config).execution_options(isolation_level='AUTOCOMMIT')
+
+        with server.connect() as connection:
+            connection.execute(text(statement))
+
+    execute(f'DROP DATABASE IF EXISTS {db_name}')
+    execute(f'CREATE DATABASE {db_name}')
+
+    config_file = tmp_path / 'db_config.yml'
+    config_file.write_text(f'db_engine: {config["db_engine"]}\n'
+                            f'port: {config["port"]}\ndb_name: {db_name}\n')
+
+    engine = get_engine(get_config(config_file))
+
+    # Results table created with the columns in another order than the model
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE results (outcome VARCHAR(50), '
+                                'team_2 VARCHAR(50), team_1 VARCHAR(50), '
+                                'home VARCHAR(50), league_match INTEGER, '
+                                'season INTEGER, PRIMARY KEY '
+                                '(season, league_match, team_1, team_2))'))
+
+    create_schema(config_file)
+
+    with engine.begin() as connection:
+        for data, table in ((results, Results), (general, GeneralRanking),
+                            (home, HomeRanking), (away, AwayRanking)):
+            data = pd.concat([data, data.assign(season=2005)])
+            connection.execute(insert(table), data.to_dict('records'))
+
+    create_feature_view(engine)
+
+    yield config_file, engine
+
+    dispose_engines()
+    execute(f'DROP DATABASE {db_name}')
+
+
+def test_partition_ranges():
+    assert get_partition_ranges(1999, 2021, 10) == [(1999, 2009), (2009, 2019),
+                                                    (2019, 2022)]
+    assert get_partition_ranges(2000, 2000, 5) == [(2000, 2001)]
+
+def test_partitioned_table_sql():
+    statements = get_partitioned_table_sql(Results, 2000, 2009, 5)
+
+    assert statements[0].startswith('CREATE TABLE results (')
+    assert 'PRIMARY KEY (season, league_match, team_1, team_2)' in statements[0]
+    assert statements[0].endswith('PARTITION BY RANGE (season)')
+    assert statements[1:] == [
+        'CREATE TABLE results_2000_2004 PARTITION OF results '
+        'FOR VALUES FROM (2000) TO (2005)',
+        'CREATE TABLE results_2005_2009 PARTITION OF results '
+        'FOR VALUES FROM (2005) TO (2010)',
+        'CREATE TABLE results_default PARTITION OF results DEFAULT'
+    ]
+
+def test_drop_unused_indexes(get_sqlite_db):
+    """
+    Test the migrations drop the indexes created by earlier versions
+    """
+    config_file, engine = get_sqlite_db
+
+    with engine.begin() as connection:
+        connection.execute(text('CREATE INDEX ix_general_ranking_team_season_league_match '
+                                'ON general_ranking (team, season, league_match)'))
+
+    assert inspect(engine).get_indexes('general_ranking')
+
+    create_schema(config_file)
+
+    assert inspect(engine).get_indexes('general_ranking') == []
+
+def test_fix_results_orientation(get_features_df, get_sqlite_db):
+    """
+    Test the second round results are fixed once, team_1 being the home team
+    """
+    results, _, _, _, _ = get_features_df
+    config_file, engine = get_sqlite_db
+    keys = ['season', 'league_match', 'team_1', 'team_2']
+    swapped = results['home'] == 'team_2'
+    swap = {'team_1': 'team_2', 'team_2': 'team_1'}
+
+    expected = results.assign(
+        home='team_1',
+        outcome=results['outcome'].where(~swapped, results['outcome'].replace(swap))
+    ).sort_values(keys).reset_index(drop=True)
+
+    assert fix_results_orientation(engine) == swapped.sum() > 0
+    assert fix_results_orientation(engine) == 0
+
+    manager = DBManager(config_file)
+    data = manager.read_dataframe(Results, method='sql')
+    manager.close()
+
+    assert_frame_equal(data.sort_values(keys).reset_index(drop=True), expected)
+
+@pytest.mark.skipif(TEST_DB_CONFIG is None, reason='TEST_DB_CONFIG is not set')
+def test_partition_by_season(unpartitioned_db):
+    """
+    Test the rows, the primary keys and the indexes of the tables are kept
+    after partitioning them, and the manager reads and inserts into them
+    """
+    config_file, engine = unpartitioned_db
+    manager = DBManager(config_file)
+    expected = {table: manager.read_dataframe(table, method='sql')
+                for table in TABLES}
+    manager.close()
+
+    partition_by_season(engine, 1995, 2004, size=5)
+
+    with engine.connect() as connection:
+        def query(statement, **params):
+            return connection.execute(text(statement), params).fetchall()
+
+        for table in TABLES:
+            name = table.__tablename__
+            partitions = [row[0] for row in query(
+                            'SELECT c.relname FROM pg_inherits i '
+                            'JOIN pg_class c ON c.oid = i.inhrelid '
+                            'WHERE i.inhparent = CAST(:name AS regclass) '
+                            'ORDER BY c.relname', name=name)]
+
+            assert query('SELECT 1 FROM pg_partitioned_table '
+                        'WHERE partrelid = CAST(:name AS regclass)', name=name)
+            assert partitions == [f'{name}_1995_1999', f'{name}_2000_2004',
+                                    f'{name}_default']
+
+            # The 1999 rows are in their partition and the 2005 rows in the
+            # default one
+            counts = [query(f'SELECT count(*) FROM {partition}')[0][0]
+                        for partition in partitions]
+            assert counts == [len(expected[table]) // 2, 0,
+                                len(expected[table]) // 2]
+
+            primary_key = query('SELECT pg_get_constraintdef(oid) '
+                                'FROM pg_constraint WHERE contype = \'p\' '
+                                'AND conrelid = CAST(:name AS regclass)',
+                                name=name)[0][0]
+            key_columns = ', '.join(column.name
+                                    for column in table.__table__.primary_key)
+            assert primary_key == f'PRIMARY KEY ({key_columns})'
+
+            indexes = {row[0] for row in query(
+                        'SELECT indexname FROM pg_indexes '
+                        'WHERE tablename = :name', name=name)}
+            assert indexes == {f'{name}_pkey'}
+            for partition in partitions:
+                partition_indexes = query('SELECT indexdef FROM pg_indexes '
+                                            'WHERE tablename = :name',
+                                            name=partition)
+                assert len(partition_indexes) == len(indexes)
+                assert any('UNIQUE' in row[0] for row in partition_indexes)
+
+        assert query("SELECT 1 FROM pg_matviews "
+                    "WHERE matviewname = 'features_view'")
+
+    manager = DBManager(config_file)
+
+    for table in TABLES:
+        assert_frame_equal(manager.read_dataframe(table, method='sql'),
+                            expected[table])
+        assert_frame_equal(manager.read_dataframe(table, method='copy'),
+                            expected[table])
+
+    results = expected[Results]
+    records = list(results.itertuples(index=False, name=None))
+    assert manager.bulk_insert(records, Results) == (0, len(records))
+
+    row = results.iloc[0].to_dict()
+    manager.insert({**row, 'season': 2002}, Results)
+    manager.insert(row, Results)
+
+    data = manager.read_dataframe(Results, method='sql')
+    assert len(data) == len(results) + 1
+    assert (data['season'] == 2002).sum() == 1
+
+    ranking = expected[GeneralRanking]
+    new_season = ranking[ranking['season'] == 1999].assign(season=2003)
+    assert manager.bulk_insert(to_records(new_season), GeneralRanking) \
+            == (len(new_season), 0)
+
+    with engine.connect() as connection:
+        count = connection.execute(text('SELECT count(*) '
+                                        'FROM general_ranking_2000_2004')).scalar()
+    assert count == len(new_season)
+
+    manager.close()
@@ -6,10 +6,12 @@ from pandas._testing import assert_frame_equal
 from src.preprocessing.cleaning_preprocesses import (
     RemoveSpecialCharacters,
     RemoveFirstLeagueMatch,
+    ValidateRankingCoverage,
+    find_missing_rankings,
 )
 from src.preprocessing.utils import FeaturePipeline
 from src.config.logger_config import logger
-from test.data.data_fixtures import get_df_to_clean
+from test.data.data_fixtures import get_df_to_clean, get_features_df
 
 def test_remove_special_characters(get_df_to_clean):
     """
@@ -56,4 +58,35 @@ def test_cleaning_pipeline(get_df_to_clean):
     ])
     cleaned_df = cleaning_pipeline.transform(get_df_to_clean)
 
-    assert_frame_equal(cleaned_df, expected_df)
\ No newline at end of file
+    assert_frame_equal(cleaned_df, expected_df)
+
+def test_find_missing_rankings(get_features_df):
+    """
+    Test that all the results without rankings are found at once
+    """
+    results, general, home, away, _ = get_features_df
+
+    # Remove a ranking row and add a result with an unknown team
+    home = home[~((home['league_match'] == 9) & (home['team'] == 'Alaves'))]
+    unknown_team = pd.DataFrame({'season': [1999], 'league_match': [5],
+                                'home': ['team_1'], 'team_1': ['Unknown'],
+                                'team_2': ['Alaves'], 'outcome': ['draw']})
+    results = pd.concat([results, unknown_team], ignore_index=True)
+
+    rankings = {'general': general, 'home': home, 'away': away}
+    missing = find_missing_rankings(results, rankings)
+
+    assert len(missing) == 2
+    assert missing['league_match'].tolist() == [10, 5]
+    assert missing['missing'].tolist() == [
+        'home:team_1',
+        'general:team_1,home:team_1,away:team_1'
+    ]
+
+    with pytest.raises(KeyError):
+        ValidateRankingCoverage(general, home, away)(results)
+
+    valid_results = ValidateRankingCoverage(general, home, away,
+                                            drop=True)(results)
+
+    assert len(valid_results) == len(results) - 2
@@ -0,0 +1,80 @@
+import pandas as pd
+
+from src.preprocessing.dependencies import (
+    get_required_features,
+    get_required_ranking_features,
+    get_required_columns,
+    get_unrequired_features
+)
+from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.model_preprocessing import feature_eng_pipeline
+from src.preprocessing.config import RANKING_FEATURES
+from src.config.config import VARIABLES
+from pandas._testing import assert_frame_equal
+
+from test.data.data_fixtures import get_features_df
+
+def test_required_features():
+    """
+    Test the ratios are replaced by the counts they are computed from
+    """
+    features = get_required_features(['home_win_ratio_t1', 'rank_t2',
+                                        'outcome'])
+
+    assert features == ['home_wins_t1', 'rank_t2', 'outcome']
+
+def test_required_columns():
+    """
+    Test the general wins, draws and losses are not computed nor retrieved
+    """
+    ranking_features = get_required_ranking_features(VARIABLES)
+    features = [feature for _, _, feature in ranking_features]
+
+    assert len(ranking_features) == len(RANKING_FEATURES) - 3
+    assert 'general_wins' not in features
+    assert 'home_wins' in features
+
+    columns = get_required_columns(VARIABLES)
+
+    assert columns['general'] == ['season', 'league_match', 'team', 'rank_pos',
+                                'goals_scored', 'goals_conceded']
+    assert columns['home'] == ['season', 'league_match', 'team', 'wins',
+                                'draws', 'losses', 'goals_scored',
+                                'goals_conceded']
+    assert get_unrequired_features(VARIABLES) == [
+        f'general_{count}_{team}' for count in ('wins', 'draws', 'losses')
+        for team in ('t1', 't2')]
+
+def test_projected_features():
+    """
+    Test the model preprocessing gives the same data without the features
+    which are not required
+    """
+    df = pd.read_csv('test/data/results_1999_transformed.csv')
+    X = df.drop('outcome', axis=1)
+    required = get_required_ranking_features(VARIABLES)
+    unused = [f'{feature}_{team}' for table, column, feature in RANKING_FEATURES
+                if (table, column, feature) not in required
+                for team in ('t1', 't2')]
+
+    expected = feature_eng_pipeline().fit_transform(X).drop('created_on', axis=1)
+    X_trans = feature_eng_pipeline().fit_transform(X.drop(unused, axis=1))
+
+    assert_frame_equal(X_trans.drop('created_on', axis=1), expected)
+
+def test_projected_feature_pipeline(get_features_df):
+    """
+    Test the feature pipeline only computes the required features from the
+    required ranking columns
+    """
+    results, general, home, away, expected_results = get_features_df
+    columns = get_required_columns(VARIABLES)
+
+    pipeline = get_feature_pipeline(general[columns['general']],
+                                    home[columns['home']],
+                                    away[columns['away']],
+                                    features=get_required_ranking_features(VARIABLES))
+    results_trans = pipeline(results)
+
+    assert len(results_trans.columns) == len(expected_results.columns) - 6
+    assert_frame_equal(results_trans, expected_results[results_trans.columns])
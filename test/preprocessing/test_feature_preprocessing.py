@@ -1,10 +1,18 @@
 from test.data.data_fixtures import get_features_df
 import pytest
+import pandas as pd
 
 from src.preprocessing.features_preprocesses import (
     get_feature_pipeline,
+    get_merge_feature_pipeline,
     FeaturePipeline,
-    ComputeWins
+    ComputeWins,
+    ComputeRankingStatistics,
+    ComputeStreaks,
+    ComputeFormPoints,
+    ComputeFormGoalsScored,
+    get_team_matches,
+    RankingIndex
 )
 from pandas._testing import assert_frame_equal
 
@@ -17,4 +25,124 @@ def test_feature_pipeline(get_features_df):
 
     results_trans = pipeline(results)
 
-    assert_frame_equal(results_trans, expected_results)
\ No newline at end of file
+    assert_frame_equal(results_trans, expected_results)
+
+# The preprocesses add columns to the frame returned by SortColumns
+@pytest.mark.filterwarnings('error::pandas.errors.SettingWithCopyWarning')
+def test_feature_pipeline_form(get_features_df):
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away, results=results,
+                                    form_windows=[3, 5])
+
+    results_trans = pipeline(results.copy())
+    form_columns = [f'form_{statistic}_last{window}_{team}'
+                    for statistic in ('points', 'goals_scored', 'goals_conceded')
+                    for window in (3, 5) for team in ('t1', 't2')]
+
+    assert set(form_columns) <= set(results_trans.columns)
+    assert_frame_equal(results_trans[expected_results.columns], expected_results)
+
+def test_ranking_index(get_features_df):
+    _, general, _, _, _ = get_features_df
+
+    index = RankingIndex(general)
+    row = index.get(1999, 1, 'Alaves')
+
+    assert len(index) == len(general)
+    assert list(row[:4]) == [1999, 1, 20, 'Alaves']
+    assert (1999, 0, 'Alaves') not in index
+
+def test_merge_feature_pipeline(get_features_df):
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_merge_feature_pipeline(general, home, away)
+
+    results_trans = pipeline(results)
+
+    assert_frame_equal(results_trans, expected_results)
+
+def test_compute_ranking_statistics(get_features_df):
+    results, general, _, _, expected_results = get_features_df
+
+    preprocess = ComputeRankingStatistics(
+                    general,
+                    ['team_1', 'team_2'],
+                    {'wins': ['general_wins_t1', 'general_wins_t2'],
+                     'goals_scored': ['general_goals_scored_t1',
+                                      'general_goals_scored_t2']})
+    results_trans = preprocess(results)
+
+    new_columns = ['general_wins_t1', 'general_wins_t2',
+                   'general_goals_scored_t1', 'general_goals_scored_t2']
+
+    assert list(results_trans.columns[-4:]) == new_columns
+    assert_frame_equal(results_trans[new_columns],
+                        expected_results[new_columns])
+
+def test_compute_streaks():
+    data = {
+        'season': [1999] * 5,
+        'league_match': [1, 2, 3, 4, 5],
+        'home': ['team_1', 'team_2', 'team_1', 'team_2', 'team_1'],
+        'team_1': ['Betis'] * 5,
+        'team_2': ['Celta'] * 5,
+        'outcome': ['team_1', 'team_1', 'team_1', 'draw', 'team_2']
+    }
+    results = pd.DataFrame(data)
+
+    results_trans = ComputeStreaks(results)(results.copy())
+
+    assert results_trans['wins_streak_t1'].tolist() == [0, 1, 2, 3, 0]
+    assert results_trans['losses_streak_t2'].tolist() == [0, 1, 2, 3, 0]
+    assert results_trans['draws_streak_t1'].tolist() == [0, 0, 0, 0, 1]
+    assert results_trans['draws_streak_t2'].tolist() == [0, 0, 0, 0, 1]
+
+def test_compute_form(get_features_df):
+    results, general, _, _, expected_results = get_features_df
+
+    # Add the first league match, needed to compute the form before the
+    # second one
+    first_match = pd.DataFrame({'season': [1999], 'league_match': [1],
+                                'home': ['team_1'], 'team_1': ['Malaga'],
+                                'team_2': ['Alaves'], 'outcome': ['team_1']})
+    history = pd.concat([first_match, results], ignore_index=True)
+    matches = get_team_matches(history, general)
+
+    points = ComputeFormPoints(matches, windows=[1, 38])
+    goals_scored = ComputeFormGoalsScored(matches, windows=[38])
+    away_points = ComputeFormPoints(matches, windows=[38], venue='away')
+    results_trans = away_points(goals_scored(points(results.copy())))
+
+    first = results_trans.iloc[0]
+
+    # Alaves lost and Malaga won the first league match
+    assert (first['form_points_last1_t1'], first['form_points_last1_t2']) == (0, 3)
+    assert first['away_form_points_last38_t1'] == 0
+    assert (first['form_goals_scored_last38_t1']
+            == expected_results.iloc[0]['general_goals_scored_t1'])
+
+    # With a window as long as the season the form is cumulative
+    last = results_trans.iloc[-1]
+    expected_goals = expected_results.iloc[-1]['general_goals_scored_t2']
+
+    assert last['form_goals_scored_last38_t2'] == expected_goals
+
+def test_update_form(get_features_df):
+    """
+    Test that updating the form round by round gives the same features as
+    computing them from the whole history
+    """
+    results, general, _, _, _ = get_features_df
+    matches = get_team_matches(results, general)
+
+    for preprocess, kwargs in ((ComputeFormPoints, {}),
+                                (ComputeFormGoalsScored, {'venue': 'home'})):
+        expected = preprocess(matches, windows=[1, 3, 10], **kwargs)
+        form = preprocess(matches[matches['league_match'] <= 10],
+                            windows=[1, 3, 10], **kwargs)
+
+        for league_match in range(11, 39):
+            form.update(matches[matches['league_match'] == league_match])
+
+        assert_frame_equal(form(results.copy()), expected(results.copy()))
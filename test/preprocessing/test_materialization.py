@@ -0,0 +1,140 @@
+import pytest
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pandas._testing import assert_frame_equal
+
+from src.preprocessing.features_preprocesses import get_feature_pipeline
+from src.preprocessing.materialization import FeatureTable, write_parquet_chunks
+from test.data.data_fixtures import get_features_df
+
+def test_incremental_feature_table(get_features_df, tmp_path):
+    """
+    Test that appending new league matches gives the same features as
+    computing them from scratch
+    """
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+
+    assert feature_table.get_watermark() is None
+
+    # Materialize the first half of the season
+    first_half = results[results['league_match'] <= 19].reset_index(drop=True)
+    feature_table.save(pipeline(first_half))
+
+    assert feature_table.get_watermark() == (1999, 19)
+
+    # Only the new league matches are processed
+    new_results = feature_table.get_new_results(results)
+
+    assert new_results['league_match'].min() == 20
+
+    data = feature_table.append(pipeline(new_results))
+
+    assert feature_table.get_watermark() == (1999, 38)
+    assert_frame_equal(data, expected_results)
+
+def test_save_chunks(get_features_df, tmp_path):
+    """
+    Test that writing the features in chunks gives the same table
+    """
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+
+    chunks = (pipeline(results[results['league_match'].between(start, start + 9)]
+                        .reset_index(drop=True))
+                for start in range(1, 39, 10))
+
+    assert feature_table.save_chunks(chunks) == len(results)
+    assert feature_table.get_watermark() == (1999, 38)
+    assert_frame_equal(feature_table.load(), expected_results)
+
+def test_failed_save_keeps_table(get_features_df, tmp_path):
+    """
+    Test that a save which fails halfway keeps the previous table and its
+    watermark
+    """
+    results, general, home, away, _ = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+    first_half = pipeline(results[results['league_match'] <= 19]
+                            .reset_index(drop=True))
+    feature_table.save(first_half)
+
+    def chunks():
+        yield pipeline(results[results['league_match'] > 19]
+                        .reset_index(drop=True))
+        raise RuntimeError('Interrupted')
+
+    with pytest.raises(RuntimeError):
+        feature_table.save_chunks(chunks())
+
+    assert feature_table.get_watermark() == (1999, 19)
+    assert_frame_equal(feature_table.load(), first_half)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['features.parquet']
+
+def test_save_empty(get_features_df, tmp_path):
+    """
+    Test that saving no features leaves the table without watermark, so the
+    next append does not skip any league match
+    """
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+    feature_table.save(pipeline(results[results['league_match'] <= 19]
+                                .reset_index(drop=True)))
+
+    feature_table.save(expected_results.iloc[:0])
+
+    assert feature_table.get_watermark() is None
+    assert len(feature_table.load()) == 0
+
+    data = feature_table.append(pipeline(feature_table.get_new_results(results)))
+
+    assert feature_table.get_watermark() == (1999, 38)
+    assert_frame_equal(data, expected_results)
+
+def test_save_no_chunks(get_features_df, tmp_path):
+    """
+    Test that saving an empty stream of chunks removes the table
+    """
+    results, general, home, away, _ = get_features_df
+
+    pipeline = get_feature_pipeline(general, home, away)
+    feature_table = FeatureTable(tmp_path / 'features.parquet')
+    feature_table.save(pipeline(results))
+
+    assert feature_table.save_chunks(iter([])) == 0
+    assert not feature_table.exists()
+    assert feature_table.get_watermark() is None
+    assert list(tmp_path.iterdir()) == []
+
+def test_write_parquet_chunks_seasons(get_features_df, tmp_path):
+    """
+    Test that the chunks of several seasons with different teams are
+    written as one row group each and read back as a single table
+    """
+    results, general, home, away, _ = get_features_df
+
+    seasons = []
+
+    for season, teams in ((1999, {}), (2000, {'Alaves': 'Almeria'}),
+                            (2001, {'Betis': 'Eibar'})):
+        season_results, season_general, season_home, season_away = (
+            data.assign(season=season).replace(teams)
+            for data in (results, general, home, away))
+        pipeline = get_feature_pipeline(season_general, season_home, season_away)
+        seasons.append(pipeline(season_results))
+
+    path = tmp_path / 'features.parquet'
+
+    assert write_parquet_chunks(iter(seasons), path) == 3 * len(results)
+    assert pq.ParquetFile(path).num_row_groups == 3
+    assert_frame_equal(pd.read_parquet(path),
+                        pd.concat(seasons, ignore_index=True))
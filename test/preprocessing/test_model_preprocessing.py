@@ -9,6 +9,8 @@ from src.preprocessing.model_preprocessing import (
     WinRatio,
     DrawRatio,
     LossRatio,
+    RatioFeatures,
+    compile_pipeline,
 )
 from src.config.config import VARIABLES
 
@@ -49,6 +51,26 @@ def test_feature_selector():
 
     assert list(X_trans.columns) == ['league_match', 'outcome']
 
+def test_feature_selector_projection():
+    """
+    Test the FeatureSelector only accepts missing features when they are
+    left out by the projection
+    """
+    df = pd.DataFrame({'league_match': [10], 'home': ['team_1'],
+                        'general_goals_scored_t1': [15]})
+
+    # The general wins are not required by the variables
+    selector = FeatureSelector(['home', 'general_wins_t1'])
+
+    assert list(selector.fit_transform(df).columns) == ['league_match',
+                                                        'general_goals_scored_t1']
+
+    with pytest.raises(KeyError):
+        FeatureSelector(['home', 'general_goals_scored_t2']).fit_transform(df)
+
+    with pytest.raises(KeyError):
+        FeatureSelector(['hoem']).fit_transform(df)
+
 def test_to_dataset():
     """
     Test the ToDataset preprocess
@@ -126,4 +148,68 @@ def test_loss_ratio():
     assert X_trans['home_loss_ratio_t1'].values == 1.0
     assert X_trans['home_loss_ratio_t2'].values == 1.0
     assert X_trans['away_loss_ratio_t1'].values == 1.0
-    assert X_trans['away_loss_ratio_t2'].values == 1.0
\ No newline at end of file
+    assert X_trans['away_loss_ratio_t2'].values == 1.0
+
+def test_ratio_features():
+    """
+    Test the RatioFeatures preprocess
+    """
+    df = pd.read_csv('test/data/results_1999_transformed.csv')
+    original_df = df.copy()
+
+    X_trans = RatioFeatures().fit_transform(df)
+
+    # The input data is not modified
+    pd.testing.assert_frame_equal(df, original_df)
+
+    # Same columns and values as the single ratio preprocesses
+    expected = LossRatio().transform(DrawRatio().transform(
+                                        WinRatio().transform(df.copy())))
+
+    assert list(X_trans.columns) == list(expected.columns)
+    assert np.allclose(X_trans.values[:, df.shape[1]:].astype(float),
+                        expected.values[:, df.shape[1]:].astype(float))
+
+def test_compiled_pipeline():
+    """
+    Test that the compiled pipeline gives the same values as the original
+    """
+    df = pd.read_csv('test/data/results_1999_transformed.csv')
+    X = df.drop('outcome', axis=1)
+
+    pipeline = feature_eng_pipeline()
+    pipeline.fit(X)
+
+    expected = pipeline.transform(X).drop('created_on', axis=1)
+
+    compiled = compile_pipeline(pipeline)
+    X_trans = compiled.transform(X)
+
+    assert compiled.columns == list(expected.columns)
+    assert np.array_equal(X_trans, expected.values.astype(np.float64))
+
+    # Single rows given as arrays in the input columns order
+    row = X[compiled.input_columns].values[0]
+
+    assert np.array_equal(compiled.transform(row), X_trans[:1])
+
+def test_float32_pipeline():
+    """
+    Test the pipelines in float32 mode give the float64 values rounded
+    """
+    df = pd.read_csv('test/data/results_1999_transformed.csv')
+    X = df.drop('outcome', axis=1)
+
+    expected = feature_eng_pipeline('float64').fit_transform(X)
+    pipeline = feature_eng_pipeline('float32')
+    X_trans = pipeline.fit_transform(X).drop('created_on', axis=1)
+
+    assert (X_trans.dtypes == np.float32).all()
+    assert np.array_equal(X_trans.values,
+                        expected.drop('created_on', axis=1).values.astype(np.float32))
+
+    compiled = compile_pipeline(pipeline)
+    X_compiled = compiled.transform(X)
+
+    assert X_compiled.dtype == np.float32
+    assert np.array_equal(X_compiled, X_trans.values)
@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from pandas._testing import assert_frame_equal
+
+from src.preprocessing.features_preprocesses import get_tensor_feature_pipeline
+from src.preprocessing.ranking_tensor import (
+    get_ranking_tensors,
+    RankingTensor,
+    TeamDictionary
+)
+from test.data.data_fixtures import get_features_df
+
+def test_ranking_tensor(get_features_df):
+    _, general, home, away, _ = get_features_df
+
+    tensors = get_ranking_tensors(general, home, away)
+    general_tensor = tensors['general']
+
+    assert general_tensor.data.dtype == np.int16
+    assert general_tensor.data.shape == (1, 39, 20, 8)
+
+    values = general_tensor.get([1999, 1999], [1, 1], ['Alaves', 'Barcelona'],
+                                ['rank_pos', 'goals_scored'])
+
+    assert values.tolist() == [[20, 1], [2, 2]]
+
+    with pytest.raises(KeyError):
+        general_tensor.get([1999], [0], ['Alaves'], ['wins'])
+
+def test_ranking_tensor_duplicates(get_features_df):
+    """
+    Test the first occurrence of a duplicated key is kept
+    """
+    _, general, _, _, _ = get_features_df
+
+    duplicate = general.iloc[[0]].assign(goals_scored=99)
+    ranking = pd.concat([general, duplicate, duplicate.assign(goals_scored=98)],
+                        ignore_index=True)
+
+    tensor = RankingTensor(ranking, TeamDictionary(ranking['team']),
+                            (1999, 1999), 38)
+    values = tensor.get(duplicate['season'], duplicate['league_match'],
+                        duplicate['team'], ['goals_scored'])
+
+    assert values.tolist() == [[general['goals_scored'].iloc[0]]]
+
+def test_tensor_feature_pipeline(get_features_df):
+    results, general, home, away, expected_results = get_features_df
+
+    pipeline = get_tensor_feature_pipeline(general, home, away)
+
+    results_trans = pipeline(results)
+
+    assert_frame_equal(results_trans, expected_results)
@@ -0,0 +1,133 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from pandas._testing import assert_frame_equal
+
+from src.preprocessing.features_preprocesses import (
+    ComputeEloRating,
+    get_feature_pipeline
+)
+from src.preprocessing.ratings import EloRating, get_required_rating
+from test.data.data_fixtures import get_features_df
+
+def test_elo_rating():
+    data = {
+        'season': [1999, 1999],
+        'league_match': [1, 2],
+        'home': ['team_1', 'team_2'],
+        'team_1': ['Betis', 'Betis'],
+        'team_2': ['Celta', 'Celta'],
+        'outcome': ['team_1', 'draw']
+    }
+    results = pd.DataFrame(data)
+
+    rating = EloRating(k=20, home_advantage=0).update(results)
+
+    # Betis won with the same rating so it gets half of k
+    assert rating.get_current_ratings(['Betis', 'Celta']).tolist() == [
+        1510 + 20 * (0.5 - 1 / (1 + 10 ** (-20 / 400))),
+        1490 - 20 * (0.5 - 1 / (1 + 10 ** (-20 / 400)))
+    ]
+    assert rating.get_ratings([1999], [2], ['Celta']).tolist() == [1490]
+
+def test_elo_rating_missing_snapshots():
+    """
+    Test the current ratings are only used after the watermark
+    """
+    data = {
+        'season': [1999, 1999],
+        'league_match': [1, 3],
+        'home': ['team_1', 'team_2'],
+        'team_1': ['Betis', 'Betis'],
+        'team_2': ['Celta', 'Celta'],
+        'outcome': ['team_1', 'draw']
+    }
+    rating = EloRating(k=20, home_advantage=0).update(pd.DataFrame(data))
+    current = rating.get_current_ratings(['Betis'])[0]
+
+    # Betis did not play the second league match, the current rating
+    # includes the third one
+    ratings = rating.get_ratings([1999, 1999, 2000], [2, 4, 1],
+                                ['Betis', 'Betis', 'Betis'])
+
+    assert np.isnan(ratings[0])
+    assert ratings[1:].tolist() == [current, current]
+
+def test_incremental_elo_rating(get_features_df, tmp_path):
+    results, _, _, _, _ = get_features_df
+
+    full_rating = EloRating().update(results)
+
+    # Apply the first half, persist it and apply the whole history
+    rating = EloRating().update(results[results['league_match'] < 20])
+    rating.save(tmp_path / 'elo.pkl')
+    rating = EloRating.load(tmp_path / 'elo.pkl').update(results)
+
+    assert rating.watermark == (1999, 38)
+    assert len(rating.snapshots) == 2 * len(results)
+
+    results_trans = ComputeEloRating(rating)(results.copy())
+    expected = ComputeEloRating(full_rating)(results.copy())
+
+    assert np.allclose(results_trans['elo_t1'], expected['elo_t1'])
+    assert np.allclose(results_trans['elo_t2'], expected['elo_t2'])
+    assert np.allclose(expected['elo_t1'].values,
+                        full_rating.snapshots['rating'].values[:len(results)])
+
+def test_elo_rating_late_results(get_features_df):
+    """
+    Test the last league match is applied again when its results arrive
+    late or change, so the ratings match a full recompute
+    """
+    results, _, _, _, _ = get_features_df
+    full_rating = EloRating().update(results)
+
+    last_round = results['league_match'] == 20
+    late = last_round & (results['team_1'] == results.loc[last_round, 'team_1'].iloc[0])
+    not_played = last_round & ~late
+    not_played &= not_played.cumsum() == 1
+
+    # A match of the last league match arrives late, another one was not
+    # played yet
+    first = results[(results['league_match'] <= 20) & ~late].copy()
+    first.loc[not_played, 'outcome'] = 'NA'
+
+    rating = EloRating().update(first)
+    assert rating.watermark == (1999, 20)
+
+    rating.update(results[results['league_match'] <= 20])
+    teams = list(full_rating._team_ids)
+    expected = EloRating().update(results[results['league_match'] <= 20])
+
+    assert np.allclose(rating.get_current_ratings(teams),
+                        expected.get_current_ratings(teams))
+
+    rating.update(results)
+
+    assert np.allclose(rating.get_current_ratings(teams),
+                        full_rating.get_current_ratings(teams))
+    assert len(rating.snapshots) == 2 * len(results)
+
+    keys = ['season', 'league_match', 'team']
+    assert_frame_equal(rating.snapshots.sort_values(keys).reset_index(drop=True),
+                        full_rating.snapshots.sort_values(keys).reset_index(drop=True))
+
+def test_get_required_rating(get_features_df, tmp_path):
+    results, general, home, away, _ = get_features_df
+    path = tmp_path / 'elo.pkl'
+
+    assert get_required_rating(['rank_t1', 'outcome'], path) is None
+
+    with pytest.raises(FileNotFoundError):
+        get_required_rating(['rank_t1', 'elo_t1', 'outcome'], path)
+
+    EloRating().update(results).save(path)
+    rating = get_required_rating(['rank_t1', 'elo_t1', 'outcome'], path)
+
+    # The ratings are computed by the feature pipeline
+    data = get_feature_pipeline(general, home, away, rating=rating)(results.copy())
+    expected = ComputeEloRating(rating)(results.copy())
+
+    assert np.array_equal(data['elo_t1'].values, expected['elo_t1'].values)
+    assert np.array_equal(data['elo_t2'].values, expected['elo_t2'].values)
@@ -0,0 +1,122 @@
+import pytest
+import pandas as pd
+
+from src.preprocessing.standings import (
+    compute_standings,
+    validate_standings,
+    RESULTS_WITH_SCORES_COLS,
+    STANDINGS_STATS,
+    to_records
+)
+from src.scripts.data_ingestion.data_ingestion import derive_rankings
+from test.data.data_fixtures import get_features_df
+
+@pytest.fixture
+def results_with_scores():
+    data = [
+        (1999, 1, 'team_1', 'Betis', 'Celta', 'team_1', 2, 0),
+        (1999, 1, 'team_1', 'Malaga', 'Sevilla', 'draw', 1, 1),
+        (1999, 2, 'team_1', 'Celta', 'Malaga', 'team_2', 0, 3),
+        (1999, 2, 'team_1', 'Sevilla', 'Betis', 'team_1', 2, 1),
+    ]
+
+    return pd.DataFrame(data, columns=RESULTS_WITH_SCORES_COLS)
+
+def test_compute_standings(results_with_scores):
+    general, home, away = compute_standings(results_with_scores)
+
+    # Every team appears after every league match
+    assert len(general) == len(home) == len(away) == 8
+
+    last_general = general[general['league_match'] == 2].set_index('team')
+
+    assert last_general.loc['Malaga', ['rank_pos', 'wins', 'draws']].tolist() == [1, 1, 1]
+    assert last_general.loc['Betis', ['goals_scored', 'goals_conceded']].tolist() == [3, 2]
+    assert last_general.loc['Celta', 'rank_pos'] == 4
+
+    # Sevilla played at home in the second league match
+    last_home = home[home['league_match'] == 2].set_index('team')
+    last_away = away[away['league_match'] == 2].set_index('team')
+
+    assert last_home.loc['Sevilla', ['matches', 'wins']].tolist() == [1, 1]
+    assert last_away.loc['Sevilla', ['matches', 'draws']].tolist() == [1, 1]
+    assert last_home.loc['Betis', 'matches'] == 1
+
+def test_validate_standings(results_with_scores):
+    general, _, _ = compute_standings(results_with_scores)
+
+    assert len(validate_standings(general, general)) == 0
+
+    scraped = general.copy()
+    scraped.loc[0, 'wins'] += 1
+
+    assert len(validate_standings(general, scraped)) == 1
+
+def test_derive_rankings(results_with_scores):
+    """
+    Test the derived rankings are returned when the general ranking matches
+    the scraped one, and an error is raised otherwise
+    """
+    general, home, away = compute_standings(results_with_scores)
+    results = list(results_with_scores.itertuples(index=False, name=None))
+
+    class Parser():
+        def __init__(self, general_ranking):
+            self._general_ranking = general_ranking
+
+        def parse_general_data(self, data, with_scores=False):
+            return self._general_ranking, results
+
+    scraped = to_records(general)
+    _, derived_results, derived_home, derived_away = derive_rankings(
+                                                    Parser(scraped), [])
+
+    assert derived_results == [result[:6] for result in results]
+    assert derived_home == to_records(home)
+    assert derived_away == to_records(away)
+
+    scraped[0] = scraped[0][:4] + (scraped[0][4] + 1,) + scraped[0][5:]
+
+    with pytest.raises(ValueError):
+        derive_rankings(Parser(scraped), [])
+
+def get_standings_since_first_match(scraped):
+    """
+    Standings of the matches after the first league match, which is not in
+    the results fixture
+    """
+    scraped = scraped.sort_values(['team', 'league_match'])
+    first = scraped[scraped['league_match'] == 1].set_index('team')[STANDINGS_STATS]
+    standings = scraped[scraped['league_match'] > 1].copy()
+
+    standings[STANDINGS_STATS] -= first.loc[standings['team']].values
+    standings['goals_difference'] = (standings['goals_scored']
+                                    - standings['goals_conceded'])
+
+    return standings
+
+def test_compute_standings_scraped(get_features_df):
+    """
+    Test the standings derived from the results match the scraped general,
+    home and away rankings along the whole season, team_1 being the home team
+    """
+    results, general, home, away, _ = get_features_df
+
+    # Goals of each team in each match from the scraped general ranking
+    ranking = general.sort_values(['team', 'league_match'])
+    goals = ranking.assign(goals=ranking.groupby('team')['goals_scored'].diff())
+    goals = goals.set_index(['league_match', 'team'])['goals']
+
+    results = results.assign(
+        goals_t1=goals.loc[list(zip(results['league_match'], results['team_1']))].values,
+        goals_t2=goals.loc[list(zip(results['league_match'], results['team_2']))].values
+    )
+
+    assert results['league_match'].max() == 38
+
+    derived = compute_standings(results[RESULTS_WITH_SCORES_COLS])
+
+    for derived_ranking, scraped in zip(derived, (general, home, away)):
+        expected = get_standings_since_first_match(scraped)
+
+        assert len(validate_standings(derived_ranking, expected)) == 0
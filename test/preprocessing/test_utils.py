@@ -2,7 +2,21 @@ import pytest
 import pandas as pd
 import numpy as np
 
-from src.preprocessing.utils import get_training_test_sets
+from pandas._testing import assert_frame_equal
+
+from src.preprocessing.features_preprocesses import (
+    get_feature_pipeline,
+    get_merge_feature_pipeline,
+    get_tensor_feature_pipeline
+)
+from src.preprocessing.utils import (
+    apply_dtypes,
+    get_teams_dtype,
+    get_training_test_sets,
+    group_by_season,
+    SeasonParallelPipeline
+)
+from test.data.data_fixtures import get_features_df
 
 def test_utils():
     data = {
@@ -15,4 +29,71 @@ def test_utils():
     X_train, X_test, y_train, y_test = get_training_test_sets(df)
 
     assert len(y_train) == 80
-    assert len(y_test) == 20
\ No newline at end of file
+    assert len(y_test) == 20
+
+def test_season_parallel_pipeline(get_features_df):
+    results, general, home, away, _ = get_features_df
+
+    # Two seasons with the same data
+    results, general, home, away = (
+        pd.concat([df, df.assign(season=2000)], ignore_index=True)
+        for df in (results, general, home, away)
+    )
+    # Shuffle the results to check that the input order is kept
+    results = results.sample(frac=1, random_state=42)
+
+    expected = get_feature_pipeline(general, home, away)(results.copy())
+
+    pipeline = SeasonParallelPipeline(get_feature_pipeline,
+                                    [general, home, away], n_workers=2)
+    data = pipeline(results.copy())
+
+    assert_frame_equal(data, expected)
+
+def test_apply_dtypes(get_features_df):
+    results, general, home, away, expected_results = get_features_df
+
+    results, (general, home, away) = apply_dtypes(results,
+                                                [general, home, away])
+
+    assert results['team_1'].dtype == general['team'].dtype == 'category'
+    assert results['league_match'].dtype == np.int8
+    assert general['goals_scored'].dtype == np.int16
+
+    # The feature engines keep the ranking dtypes
+    for feature_pipeline in (get_feature_pipeline, get_merge_feature_pipeline,
+                            get_tensor_feature_pipeline):
+        data = feature_pipeline(general, home, away)(results.copy())
+
+        assert data['team_1'].dtype == 'category'
+        assert data['general_wins_t1'].dtype == np.int8
+        assert data['away_goals_conceded_t2'].dtype == np.int16
+        assert_frame_equal(data, expected_results, check_dtype=False,
+                            check_categorical=False)
+
+def test_apply_teams_dtype(get_features_df):
+    results, general, home, away, _ = get_features_df
+
+    teams_dtype = get_teams_dtype(list(general['team']) + ['Zaragoza'])
+    results, (general, home, away) = apply_dtypes(results, [general, home, away],
+                                                teams_dtype)
+
+    assert results['team_2'].dtype == home['team'].dtype == teams_dtype
+
+    with pytest.raises(ValueError):
+        apply_dtypes(results, [general], get_teams_dtype(['Alaves']))
+
+def test_group_by_season():
+    """
+    Test the chunks are regrouped into whole seasons
+    """
+    data = pd.DataFrame({'season': [2000] * 3 + [2001] * 4 + [2002],
+                        'league_match': [1, 2, 3, 1, 2, 3, 4, 1]})
+    chunks = [data.iloc[start:start + 3] for start in range(0, len(data), 3)]
+
+    seasons = list(group_by_season(iter(chunks)))
+
+    assert [season for season, _ in seasons] == [2000, 2001, 2002]
+    assert_frame_equal(pd.concat([df for _, df in seasons], ignore_index=True),
+                        data)
+    assert_frame_equal(seasons[1][1], data.iloc[3:7].reset_index(drop=True))